@@ -0,0 +1,104 @@
+"""Deterministic synthetic supply-chain data in the exact bronze CSV layout (24 columns).
+
+Every value is a hash of (sku, ingest, seed, column), so the same arguments always give
+the same files (for a given DuckDB version) and product-level attributes such as category
+and supplier stay stable across ingests. Generation runs in DuckDB and streams to disk, so
+10^8 rows need no more memory than 10^4.
+
+    python benchmarks/generate_data.py --rows 1e6 --files 4 --out /tmp/bench/data_raw
+"""
+import argparse
+import pathlib
+
+import duckdb
+
+# source header of data_raw/supply_chain_data.csv, in file order
+HEADER = ["Product type", "SKU", "Price", "Availability", "Number of products sold", "Revenue generated",
+          "Customer demographics", "Stock levels", "Lead times", "Order quantities", "Shipping times",
+          "Shipping carriers", "Shipping costs", "Supplier name", "Location", "Lead time",
+          "Production volumes", "Manufacturing lead time", "Manufacturing costs", "Inspection results",
+          "Defect rates", "Transportation modes", "Routes", "Costs"]
+
+
+def _u(key, per_file=True):
+    # uniform [0, 1) from the row's hash; product-level keys ignore the ingest index
+    ingest = "f" if per_file else "0"
+    return f"((hash(p, {ingest}, $seed, '{key}') % 1000003) / 1000003.0)"
+
+
+def _pick(values, key, per_file=True):
+    items = ", ".join(f"'{v}'" for v in values)
+    return f"[{items}][1 + CAST(floor({_u(key, per_file)} * {len(values)}) AS INTEGER)]"
+
+
+def _int(lo, hi, key):
+    return f"CAST({lo} + floor({_u(key)} * {hi - lo + 1}) AS BIGINT)"
+
+
+def _num(lo, hi, key):
+    return f"({lo} + {_u(key)} * {hi - lo})"
+
+
+def generate_sql():
+    """SELECT producing one ingest's rows: $products SKUs for ingest index $f."""
+    exprs = [
+        _pick(["haircare", "skincare", "cosmetics"], "category", per_file=False),
+        "'SKU' || p",
+        _num(1, 100, "price"),
+        _int(0, 100, "availability"),
+        _int(8, 1000, "sold"),
+        f"{_num(1, 100, 'price')} * {_int(8, 1000, 'sold')} * {_num(0.8, 1.2, 'revenue')}",
+        _pick(["Male", "Female", "Non-binary", "Unknown"], "demographics"),
+        _int(0, 100, "stock"),
+        _int(1, 30, "lead_times"),
+        _int(1, 100, "order_qty"),
+        _int(1, 10, "shipping_times"),
+        _pick(["Carrier A", "Carrier B", "Carrier C"], "carrier"),
+        _num(1, 10, "shipping_costs"),
+        "'Supplier ' || (1 + hash(p, $seed, 'supplier') % 5)",
+        _pick(["Mumbai", "Kolkata", "Delhi", "Bangalore", "Chennai"], "location", per_file=False),
+        _int(1, 30, "lead_time"),
+        _int(100, 1000, "production"),
+        _int(1, 30, "mfg_lead_time"),
+        _num(1, 100, "mfg_costs"),
+        _pick(["Pass", "Fail", "Pending"], "inspection"),
+        _num(0, 5, "defects"),
+        _pick(["Road", "Air", "Rail", "Sea"], "mode"),
+        _pick(["Route A", "Route B", "Route C"], "route"),
+        _num(100, 1000, "costs"),
+    ]
+    select = ",\n  ".join(f'{e} AS "{h}"' for e, h in zip(exprs, HEADER))
+    return f"SELECT\n  {select}\nFROM (SELECT range AS p, $f AS f FROM range($products))"
+
+
+def generate(out_dir, rows, files=1, seed=42):
+    """Write `files` CSVs of rows // files SKUs each (one ingest per file). Returns the paths."""
+    out_dir = pathlib.Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    products = max(1, int(rows) // files)
+    con = duckdb.connect()
+    sql = generate_sql()
+    paths = []
+    for f in range(files):
+        path = out_dir / f"supply_chain_data_{f:03d}.csv"
+        con.execute(f"COPY ({sql}) TO '{path}' (HEADER, DELIMITER ',')",
+                    {"seed": seed, "f": f, "products": products})
+        paths.append(path)
+    con.close()
+    return paths
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate synthetic bronze-layout supply chain CSVs.")
+    ap.add_argument("--rows", type=float, default=1e4, help="total rows across all files (1e4 .. 1e8)")
+    ap.add_argument("--files", type=int, default=1, help="number of ingests; each file holds rows/files SKUs")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", type=pathlib.Path, default=pathlib.Path("benchmarks/data"))
+    args = ap.parse_args()
+
+    for path in generate(args.out, int(args.rows), args.files, args.seed):
+        print(f"Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""Scale benchmark: time every pipeline stage on synthetic data and flag regressions.
+
+Each stage runs in its own process, so the reported peak RSS is that stage's alone:
+
+    generate          benchmarks/generate_data.py
+    ingest_to_bronze  scripts/ingest_to_bronze.write_parquet, one Parquet file per ingest
+    bronze_to_duckdb  scripts/bronze_to_duckdb.py
+    dbt_build         dbt run (per-model timings from run_results.json)
+    dashboard_query   the Dashboard panel queries (utils.dashboard_queries), cold cache
+    train             supply_chain_app/scripts/train_model.py
+    predict           predict_delay_batch over every fact, plus single-row predict_delay calls
+
+Results are appended to benchmarks/results/history.jsonl; with a baseline stored for the
+same row count (--save-baseline), any stage slower or larger than baseline * (1 + tolerance)
+is flagged.
+
+    python benchmarks/run_benchmark.py --rows 1e5 --files 4
+    python benchmarks/run_benchmark.py --rows 1e5 --files 4 --save-baseline
+"""
+import argparse
+import datetime
+import json
+import os
+import pathlib
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+APP = ROOT / "supply_chain_app"
+RESULTS = ROOT / "benchmarks" / "results"
+HISTORY = RESULTS / "history.jsonl"
+BASELINE = RESULTS / "baseline.json"
+DB_NAME = "supply_chain.duckdb"
+
+PROFILES = """supply_chain:
+  target: bench
+  outputs:
+    bench:
+      type: duckdb
+      path: "{path}"
+      threads: {threads}
+"""
+
+
+def run_stage(cmd, cwd, env=None):
+    """Run `cmd` as a child process; return (seconds, peak RSS in MB or None, stdout)."""
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    out = proc.stdout.read()
+    rss = None
+    if hasattr(os, "wait4"):
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        # ru_maxrss is KB on Linux, bytes on macOS
+        rss = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    else:
+        proc.wait()
+    seconds = time.perf_counter() - t0
+    if proc.returncode != 0:
+        raise RuntimeError(f"{cmd[:3]} failed ({proc.returncode}):\n{out[-2000:]}")
+    return seconds, rss, out
+
+
+def _child_result(out):
+    # in-process stages print one JSON line with their own metrics last
+    for line in reversed(out.strip().splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    return {}
+
+
+# -- stages that run inside a child of this script (--stage NAME) ----------------------
+
+def stage_ingest(work):
+    sys.path.insert(0, str(ROOT / "scripts"))
+    from ingest_to_bronze import write_parquet
+
+    start = datetime.datetime(2024, 1, 1)
+    rows = 0
+    for i, src in enumerate(sorted((work / "data_raw").glob("*.csv"))):
+        _, n = write_parquet(src, work / "storage" / "bronze", start + datetime.timedelta(hours=i))
+        rows += n
+    return {"rows": rows}
+
+
+def stage_dashboard(work):
+    os.environ["SUPPLY_CHAIN_DB"] = str(work / "warehouse" / DB_NAME)
+    sys.path.insert(0, str(APP))
+    from utils import dashboard_queries as dq, chart_data as cd
+
+    queries = {}
+    panels = [(dq, n) for n in ["filter_options", "metrics", "top_suppliers", "carrier_performance",
+                                "stockout_risk", "detail_rows"]]
+    panels += [(cd, n) for n in ["revenue_treemap", "cost_vs_lead_time", "defect_histogram", "defect_box"]]
+    for module, name in panels:
+        t0 = time.perf_counter()
+        getattr(module, name)()
+        queries[name] = round(time.perf_counter() - t0, 4)
+    return {"queries": queries}
+
+
+def stage_predict(work, single_calls=200):
+    os.chdir(work)
+    sys.path.insert(0, str(APP))
+    import duckdb
+    from utils import model_registry
+    from utils.ml import SCORING_SQL, predict_delay_batch, predict_delay
+
+    model = model_registry.load_artifact()
+    con = duckdb.connect(str(work / "warehouse" / DB_NAME), read_only=True)
+    rows, first = 0, None
+    t0 = time.perf_counter()
+    for batch in con.execute(SCORING_SQL).fetch_record_batch(100_000):
+        predict_delay_batch(model, batch)
+        rows += batch.num_rows
+        first = first or batch.slice(0, 1).to_pylist()[0]
+    batch_secs = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for _ in range(single_calls if first else 0):
+        predict_delay(model, first)
+    single_secs = time.perf_counter() - t0
+    con.close()
+    return {
+        "rows": rows,
+        "batch_rows_per_s": round(rows / batch_secs, 1) if batch_secs else None,
+        "single_calls_per_s": round(single_calls / single_secs, 1) if first and single_secs else None,
+    }
+
+
+CHILD_STAGES = {"ingest_to_bronze": stage_ingest, "dashboard_query": stage_dashboard, "predict": stage_predict}
+
+
+# -- orchestration ---------------------------------------------------------------------
+
+def benchmark(work, rows, files, seed, threads, workers):
+    py = sys.executable
+    this = str(pathlib.Path(__file__).resolve())
+    db = work / "warehouse" / DB_NAME
+    db.parent.mkdir(parents=True, exist_ok=True)
+    (work / "profiles").mkdir(exist_ok=True)
+    (work / "profiles" / "profiles.yml").write_text(PROFILES.format(path=db.as_posix(), threads=threads))
+    target = work / "dbt_target"
+
+    def child(name):
+        return [py, this, "--stage", name, "--work", str(work)]
+
+    stages = [
+        ("generate", [py, str(ROOT / "benchmarks" / "generate_data.py"), "--rows", str(rows),
+                      "--files", str(files), "--seed", str(seed), "--out", str(work / "data_raw")], work),
+        ("ingest_to_bronze", child("ingest_to_bronze"), work),
+        ("bronze_to_duckdb", [py, str(ROOT / "scripts" / "bronze_to_duckdb.py"), "--db", str(db),
+                              "--workers", str(workers)], work),
+        ("dbt_build", [shutil.which("dbt") or "dbt", "run", "--project-dir", str(ROOT / "dbt" / "supply_chain"),
+                       "--profiles-dir", str(work / "profiles"), "--target-path", str(target),
+                       "--log-path", str(work / "dbt_logs")], work),
+        ("dashboard_query", child("dashboard_query"), work),
+        ("train", [py, str(APP / "scripts" / "train_model.py"), "--db", str(db)], work),
+        ("predict", child("predict"), work),
+    ]
+
+    results = {}
+    for name, cmd, cwd in stages:
+        seconds, rss, out = run_stage(cmd, cwd)
+        entry = {"seconds": round(seconds, 4), "peak_rss_mb": round(rss, 1) if rss else None}
+        if name in CHILD_STAGES:
+            entry.update(_child_result(out))
+        if name == "dbt_build":
+            run_results = json.loads((target / "run_results.json").read_text(encoding="utf-8"))
+            entry["models"] = {r["unique_id"].rsplit(".", 1)[-1]: round(r["execution_time"], 4)
+                               for r in run_results["results"]}
+        results[name] = entry
+        rss_txt = f", peak RSS {entry['peak_rss_mb']:.0f} MB" if entry["peak_rss_mb"] else ""
+        print(f"[{name}] {seconds:.2f}s{rss_txt}")
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(stages, baseline, tolerance, min_seconds):
+    """Stages whose time or peak RSS exceeds baseline * (1 + tolerance)."""
+    flagged = []
+    for name, cur in stages.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if base["seconds"] >= min_seconds and cur["seconds"] > base["seconds"] * (1 + tolerance):
+            flagged.append(f"{name}: {cur['seconds']:.2f}s vs baseline {base['seconds']:.2f}s")
+        if base.get("peak_rss_mb") and cur.get("peak_rss_mb") and \
+                cur["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+            flagged.append(f"{name}: peak RSS {cur['peak_rss_mb']:.0f} MB vs baseline {base['peak_rss_mb']:.0f} MB")
+    return flagged
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Time every pipeline stage on synthetic data.")
+    ap.add_argument("--rows", type=float, default=1e4, help="total synthetic rows (1e4 .. 1e8)")
+    ap.add_argument("--files", type=int, default=1, help="number of bronze ingests the rows are split into")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--threads", type=int, default=os.cpu_count(), help="dbt threads")
+    ap.add_argument("--workers", type=int, default=1, help="bronze_to_duckdb --workers")
+    ap.add_argument("--work", type=pathlib.Path, default=None, help="working directory (default: a temp dir)")
+    ap.add_argument("--keep", action="store_true", help="keep the working directory")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown/growth vs baseline")
+    ap.add_argument("--min-seconds", type=float, default=0.5, help="ignore time regressions on stages faster than this")
+    ap.add_argument("--save-baseline", action="store_true", help="store this run as the baseline for --rows")
+    ap.add_argument("--fail-on-regression", action="store_true", help="exit 1 when a stage regresses")
+    ap.add_argument("--stage", choices=sorted(CHILD_STAGES), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.stage:
+        print(json.dumps(CHILD_STAGES[args.stage](args.work.resolve())))
+        return
+
+    rows = int(args.rows)
+    work = args.work or pathlib.Path(tempfile.mkdtemp(prefix="supply_chain_bench_"))
+    work = work.resolve()
+    work.mkdir(parents=True, exist_ok=True)
+    print(f"Benchmark: {rows} rows in {args.files} file(s), work dir {work}")
+    try:
+        stages = benchmark(work, rows, args.files, args.seed, args.threads, args.workers)
+    finally:
+        if not args.keep and args.work is None:
+            shutil.rmtree(work, ignore_errors=True)
+
+    baselines = json.loads(BASELINE.read_text(encoding="utf-8")) if BASELINE.exists() else {}
+    key = f"{rows}x{args.files}"
+    regressions = compare(stages, baselines.get(key, {}), args.tolerance, args.min_seconds)
+
+    record = {
+        "run_at": datetime.datetime.utcnow().isoformat() + "Z",
+        "commit": _git_commit(),
+        "rows": rows,
+        "files": args.files,
+        "seed": args.seed,
+        "stages": stages,
+        "regressions": regressions,
+    }
+    RESULTS.mkdir(parents=True, exist_ok=True)
+    with open(HISTORY, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+    print(f"Appended results to {HISTORY}")
+
+    if args.save_baseline:
+        baselines[key] = stages
+        BASELINE.write_text(json.dumps(baselines, indent=2), encoding="utf-8")
+        print(f"Saved baseline for {key}")
+    elif key not in baselines:
+        print(f"No baseline for {key}; run with --save-baseline to store one.")
+
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
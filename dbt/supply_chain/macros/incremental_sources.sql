@@ -0,0 +1,64 @@
+{#
+  Change tracking for the incremental models, driven by bronze_load_manifest.
+
+  Every model built from bronze files stores source_loaded_at, the manifest load time of
+  the files it was built from. A file (re)loaded after a model's max(source_loaded_at) is
+  a changed file for that model, so an incremental run reads the small manifest instead of
+  comparing the staged history with {{ this }}.
+
+  Reading the bronze lake directly (var raw_external_location) bypasses the manifest; every
+  file then counts as changed and the incremental models rebuild in full.
+#}
+
+{% macro manifest_tracked() %}
+  {{ return(var('raw_external_location', none) is none) }}
+{% endmacro %}
+
+{% macro source_loaded_at(source_file_column) %}
+  {%- if manifest_tracked() -%}
+    (select m.loaded_at from {{ source('raw', 'bronze_load_manifest') }} m where m.file_name = {{ source_file_column }})
+  {%- else -%}
+    cast(null as timestamp)
+  {%- endif -%}
+{% endmacro %}
+
+{% macro manifest_watermark() %}
+  {%- if manifest_tracked() -%}
+    (select max(loaded_at) from {{ source('raw', 'bronze_load_manifest') }})
+  {%- else -%}
+    cast(null as timestamp)
+  {%- endif -%}
+{% endmacro %}
+
+{% macro changed_source_files(relation) %}
+  {%- if manifest_tracked() -%}
+    select file_name from {{ source('raw', 'bronze_load_manifest') }}
+    where loaded_at > (select coalesce(max(source_loaded_at), timestamp '1900-01-01') from {{ relation }})
+  {%- else -%}
+    select distinct source_file from {{ ref('stg_supply_chain') }}
+  {%- endif -%}
+{% endmacro %}
+
+{% macro replaced_facts() %}
+  {{ return(api.Relation.create(database=target.database, schema=target.schema,
+                                identifier='fact_sales_replaced')) }}
+{% endmacro %}
+
+{% macro create_replaced_facts() %}
+  create table if not exists {{ replaced_facts() }} (
+    product_id varchar,
+    source_file varchar,
+    replaced_at timestamp
+  )
+{% endmacro %}
+
+{% macro record_replaced_facts() %}
+  {#- fact_sales pre-hook: log the products of the files about to be replaced, so models
+      aggregating per product recompute them even when the reload no longer contains them -#}
+  {% if is_incremental() %}
+  insert into {{ replaced_facts() }}
+  select distinct product_id, source_file, current_timestamp
+  from {{ this }}
+  where source_file in ({{ changed_source_files(this) }})
+  {% endif %}
+{% endmacro %}
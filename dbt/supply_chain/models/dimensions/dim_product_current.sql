@@ -0,0 +1,66 @@
+{{ config(
+    materialized='incremental',
+    unique_key='product_id',
+    incremental_strategy='delete+insert',
+    post_hook="delete from {{ this }} where updated_at is null"
+) }}
+
+-- Current state: one row per product_id with the attributes of its latest ingest.
+-- Join target for anything that wants "the product as it is now"; size stays constant
+-- as ingests accumulate in stg_supply_chain.
+-- Incremental runs read only the bronze files (re)loaded since the last build, found through
+-- bronze_load_manifest; source_loaded_at is the manifest watermark each row was built at.
+with
+{% if is_incremental() %}
+changed_files as (
+  {{ changed_source_files(this) }}
+),
+-- stored rows that came from a reloaded file may no longer exist: rebuild those products
+-- from all of their staged rows
+stale as (
+  select product_id from {{ this }}
+  where source_file in (select * from changed_files)
+),
+{% endif %}
+candidates as (
+  select *
+  from {{ ref('stg_supply_chain') }}
+  where product_id is not null
+  {% if is_incremental() %}
+    and (source_file in (select * from changed_files)
+         or product_id in (select product_id from stale))
+  {% endif %}
+),
+{% if is_incremental() %}
+-- a late file can carry an older ingest_ts, so the stored row competes with the new ones
+combined as (
+  select * exclude (supplier_id, updated_at, source_loaded_at) from {{ this }}
+  where product_id in (select product_id from candidates)
+    and product_id not in (select product_id from stale)
+  union all by name
+  select * from candidates
+),
+{% else %}
+combined as (
+  select * from candidates
+),
+{% endif %}
+latest as (
+  select *
+  from combined
+  qualify row_number() over (partition by product_id order by ingest_ts desc, source_file desc) = 1
+)
+select
+  *,
+  md5(supplier_name || '_' || coalesce(supplier_city,'')) as supplier_id,
+  current_timestamp as updated_at,
+  {{ manifest_watermark() }} as source_loaded_at
+from latest
+{% if is_incremental() %}
+-- a stale product with no staged rows left comes out as a placeholder: delete+insert drops
+-- its old row and the post-hook removes the placeholder
+union all by name
+select product_id, cast(null as timestamp) as updated_at
+from stale
+where product_id not in (select product_id from latest)
+{% endif %}
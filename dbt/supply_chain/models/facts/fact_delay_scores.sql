@@ -0,0 +1,21 @@
+{{ config(enabled=var('delay_model_exported', false)) }}
+
+-- Delay probability per fact, scored inside DuckDB with the RandomForest compiled to SQL.
+-- Disabled by default: the macro (macros/generated/delay_probability.sql, git-ignored) only
+-- exists once supply_chain_app/scripts/export_model_sql.py has written it, and is only
+-- worth it for small forests. Enable with --vars '{delay_model_exported: true}'. For larger
+-- models score with supply_chain_app/scripts/score_delays.py (sklearn, delay_predictions).
+with features as (
+  select
+    fact_id,
+    product_id,
+    supplier_lead_time_days,
+    defect_rate,
+    coalesce(shipping_cost, transport_cost) as shipping_cost
+  from {{ ref('fact_sales') }}
+)
+select
+  fact_id,
+  product_id,
+  {{ delay_probability('supplier_lead_time_days', 'defect_rate', 'shipping_cost') }} as delay_probability
+from features
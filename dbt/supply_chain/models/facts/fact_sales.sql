@@ -1,3 +1,10 @@
+{{ config(
+    materialized='incremental',
+    unique_key='source_file',
+    incremental_strategy='delete+insert',
+    pre_hook="{{ record_replaced_facts() }}"
+) }}
+
 with s as (
   select
     md5(product_id || '-' || cast(ingest_ts as varchar)) as fact_id,
@@ -6,8 +13,31 @@ with s as (
     coalesce(quantity_sold,0) as quantity_sold,
     coalesce(revenue_generated, quantity_sold * unit_price) as revenue,
     unit_price,
+    -- slice and feature attributes of the same staged row, so the rollup, the dashboard
+    -- slices and the ML queries never join back to stg_supply_chain (whose rows may be
+    -- archived by scripts/compact_warehouse.py)
+    product_category,
+    supplier_name,
+    transport_mode,
+    shipping_carrier,
+    route,
+    defect_rate,
+    shipping_cost,
+    transport_cost,
+    supplier_lead_time_days,
+    shipping_time_days,
+    mfg_lead_time_days,
     ingest_ts,
-    source_file
+    source_file,
+    current_timestamp as loaded_at,
+    {{ source_loaded_at('source_file') }} as source_loaded_at
   from {{ ref('stg_supply_chain') }}
+  {% if is_incremental() %}
+  -- only the new batch: every bronze file loaded or reloaded since the last build according
+  -- to bronze_load_manifest (including a late Parquet drop with an older ingest_ts).
+  -- delete+insert on source_file then replaces all facts of those files, so a reload leaves
+  -- no stale facts; the pre-hook logs the products they covered for the per-product models.
+  where source_file in ({{ changed_source_files(this) }})
+  {% endif %}
 )
 select * from s
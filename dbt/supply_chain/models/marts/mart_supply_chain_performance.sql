@@ -1,18 +1,61 @@
-with sales as (
-  select product_id, sum(quantity_sold) as total_sold, sum(revenue) as total_revenue
-  from {{ ref('fact_sales') }}
-  group by product_id
+{{ config(
+    materialized='incremental',
+    unique_key='product_id',
+    incremental_strategy='delete+insert',
+    post_hook="delete from {{ this }} where last_loaded_at is null"
+) }}
+
+-- Incremental runs only recompute the product_ids touched by bronze files (re)loaded since
+-- the last build; `dbt run --full-refresh -s mart_supply_chain_performance` rebuilds everything.
+with
+{% if is_incremental() %}
+changed_files as (
+  {{ changed_source_files(this) }}
 ),
-manufacturing as (
-  select product_id, avg(defect_rate) as avg_defect_rate, avg(mfg_lead_time_days) as avg_mfg_lead_time
-  from {{ ref('stg_supply_chain') }}
+-- products in the new facts of those files, and the products the files covered before a
+-- reload replaced them (logged by fact_sales' pre-hook), which may have no facts left
+touched as (
+  select product_id from {{ ref('fact_sales') }}
+  where source_file in (select * from changed_files)
+  union
+  select product_id from {{ replaced_facts() }}
+  where source_file in (select * from changed_files)
+),
+{% endif %}
+sales as (
+  select
+    product_id,
+    sum(quantity_sold) as total_sold,
+    sum(revenue) as total_revenue,
+    avg(defect_rate) as avg_defect_rate,
+    avg(mfg_lead_time_days) as avg_mfg_lead_time,
+    max(ingest_ts) as last_ingest_ts,
+    max(loaded_at) as last_loaded_at,
+    max(source_loaded_at) as source_loaded_at
+  from {{ ref('fact_sales') }}
+  {% if is_incremental() %}
+  where product_id in (select product_id from touched)
+  {% endif %}
   group by product_id
 )
 select
+  {% if is_incremental() %}
+  -- a touched product without facts comes out with null measures: delete+insert drops its
+  -- old row and the post-hook removes the placeholder
+  t.product_id,
+  {% else %}
   s.product_id,
+  {% endif %}
   s.total_sold,
   s.total_revenue,
-  m.avg_defect_rate,
-  m.avg_mfg_lead_time
+  s.avg_defect_rate,
+  s.avg_mfg_lead_time,
+  s.last_ingest_ts,
+  s.last_loaded_at,
+  s.source_loaded_at
+{% if is_incremental() %}
+from touched t
+left join sales s using (product_id)
+{% else %}
 from sales s
-left join manufacturing m using (product_id)
+{% endif %}
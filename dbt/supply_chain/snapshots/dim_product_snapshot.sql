@@ -0,0 +1,14 @@
+{% snapshot dim_product_snapshot %}
+
+-- Optional SCD2 history of dim_product_current (`dbt snapshot`): a new version row
+-- whenever a product's latest ingest_ts moves forward.
+{{ config(
+    target_schema='main',
+    unique_key='product_id',
+    strategy='timestamp',
+    updated_at='ingest_ts'
+) }}
+
+select * exclude (updated_at) from {{ ref('dim_product_current') }}
+
+{% endsnapshot %}
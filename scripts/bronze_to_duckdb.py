@@ -1,12 +1,195 @@
 # scripts/bronze_to_duckdb.py
-import duckdb, pandas as pd, pathlib, datetime, re
+import argparse, duckdb, pandas as pd, pathlib, datetime, hashlib, os, tempfile, time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 BRONZE = pathlib.Path("storage/bronze")
-files = sorted(BRONZE.glob("supply_chain_raw__*.csv"))
-if not files:
-    raise SystemExit("No bronze files found. Run ingest first.")
-LATEST = files[-1]
-print("Loading:", LATEST)
+DB_PATH = os.environ.get("SUPPLY_CHAIN_DB", "warehouse/supply_chain.duckdb")
+
+# bronze layout (24 cols, in file order)
+cols = ["product_category","sku","price","availability","number_of_products_sold","revenue_generated",
+        "customer_demographics","stock_levels","supplier_lead_time_days","order_quantities","shipping_times",
+        "shipping_carrier","shipping_costs","supplier_name","supplier_city","lead_time_meta",
+        "production_volumes","manufacturing_lead_time","manufacturing_costs","inspection_results",
+        "defect_rates","transportation_modes","routes","transport_costs"]
+
+# typed columns in raw_supply_chain; everything not listed here stays VARCHAR
+col_types = {
+    "price": "DOUBLE",
+    "availability": "BIGINT",
+    "number_of_products_sold": "BIGINT",
+    "revenue_generated": "DOUBLE",
+    "stock_levels": "BIGINT",
+    "supplier_lead_time_days": "BIGINT",
+    "order_quantities": "BIGINT",
+    "shipping_times": "BIGINT",
+    "shipping_costs": "DOUBLE",
+    "lead_time_meta": "BIGINT",
+    "production_volumes": "BIGINT",
+    "manufacturing_lead_time": "BIGINT",
+    "manufacturing_costs": "DOUBLE",
+    "defect_rates": "DOUBLE",
+    "transport_costs": "DOUBLE",
+}
+
+
+def raw_table_ddl():
+    defs = [f"{c} {col_types.get(c, 'VARCHAR')}" for c in cols]
+    defs += ["ingest_ts TIMESTAMP", "source_file VARCHAR"]
+    return "CREATE TABLE IF NOT EXISTS raw_supply_chain (\n  " + ",\n  ".join(defs) + "\n)"
+
+
+MANIFEST_DDL = """
+CREATE TABLE IF NOT EXISTS bronze_load_manifest (
+  file_name VARCHAR PRIMARY KEY,
+  file_size BIGINT,
+  file_mtime DOUBLE,
+  content_hash VARCHAR,
+  row_count BIGINT,
+  loaded_at TIMESTAMP
+)
+"""
+
+
+def file_hash(path, chunk=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def pending_files(con, files):
+    """Bronze files that are new or changed since they were last recorded in the manifest.
+
+    Files whose size and mtime match the manifest are skipped without being read, so a
+    rerun with nothing new only costs a stat() per file. Returns [(path, size, mtime, hash)].
+    """
+    seen = {r[0]: r[1:] for r in con.execute(
+        "SELECT file_name, file_size, file_mtime, content_hash FROM bronze_load_manifest").fetchall()}
+    todo = []
+    for path in files:
+        st = path.stat()
+        prev = seen.get(path.name)
+        if prev and prev[0] == st.st_size and prev[1] == st.st_mtime:
+            continue
+        digest = file_hash(path)
+        if prev and prev[2] == digest:
+            # touched but identical content: just refresh the stat fingerprint
+            con.execute("UPDATE bronze_load_manifest SET file_mtime = ? WHERE file_name = ?",
+                        [st.st_mtime, path.name])
+            continue
+        todo.append((path, st.st_size, st.st_mtime, digest))
+    return todo
+
+
+def clean_select_sql(relation):
+    """SELECT list applying the bronze cleaning rules in SQL (trim, lowercase, try_cast).
+
+    `relation` must expose the 24 `cols` as VARCHAR; ingest_ts / source_file are bound as
+    the two positional parameters.
+    """
+    exprs = []
+    for c in cols:
+        if c in col_types:
+            exprs.append(f"try_cast(trim({c}) AS {col_types[c]}) AS {c}")
+        elif c == "inspection_results":
+            exprs.append(f"lower(trim({c})) AS {c}")
+        elif c == "customer_demographics":
+            exprs.append(f"lower(coalesce(trim({c}), 'unknown')) AS {c}")
+        else:
+            exprs.append(f"trim({c}) AS {c}")
+    exprs += ["CAST(? AS TIMESTAMP) AS ingest_ts", "CAST(? AS VARCHAR) AS source_file"]
+    return "SELECT\n  " + ",\n  ".join(exprs) + f"\nFROM {relation}"
+
+
+def read_csv_sql(con, path):
+    """read_csv(...) call with the sniffed dialect and an explicit all-VARCHAR 24-column schema."""
+    path = str(path).replace("'", "''")
+    delim, has_header, n_cols = con.execute(
+        f"SELECT Delimiter, HasHeader, len(Columns) FROM sniff_csv('{path}')"
+    ).fetchone()
+    if n_cols < len(cols):
+        raise SystemExit(f"Unexpected column count {n_cols} (expected {len(cols)}) in {path}")
+    # extra trailing columns are kept by name and dropped by the SELECT, like the pandas path
+    names = cols + [f"extra_{i}" for i in range(n_cols - len(cols))]
+    colspec = "{" + ", ".join(f"'{c}': 'VARCHAR'" for c in names) + "}"
+    delim = delim.replace("'", "''")
+    return (f"read_csv('{path}', columns={colspec}, delim='{delim}', "
+            f"header={'true' if has_header else 'false'}, auto_detect=false)")
+
+
+def configure(con, threads=None, memory_limit=None):
+    # stream without keeping insertion order so the scan runs on all threads in bounded memory
+    con.execute("SET preserve_insertion_order = false")
+    con.execute(f"SET threads = {int(threads or os.cpu_count() or 1)}")
+    if memory_limit:
+        con.execute(f"SET memory_limit = '{memory_limit}'")
+
+
+def load_duckdb(con, path):
+    """Load one bronze file entirely inside DuckDB. Returns the number of rows inserted."""
+    if path.suffix == ".parquet":
+        return load_parquet(con, path)
+    sql = "INSERT INTO raw_supply_chain\n" + clean_select_sql(read_csv_sql(con, path))
+    return con.execute(sql, [datetime.datetime.utcnow(), str(path.name)]).fetchone()[0]
+
+
+def stage_file(path, out_dir, threads=1):
+    """Worker: parse, clean and validate one bronze CSV into a columnar Parquet file.
+
+    Runs on a private in-memory DuckDB so any number of workers can run at once; only the
+    single writer in main() ever touches the warehouse file.
+    """
+    t0 = time.perf_counter()
+    con = duckdb.connect()
+    con.execute(f"SET threads = {int(threads)}")
+    out = pathlib.Path(out_dir) / (path.stem + ".parquet")
+    pq = str(out).replace("'", "''")
+    sql = clean_select_sql(read_csv_sql(con, path))
+    con.execute(f"COPY ({sql}) TO '{pq}' (FORMAT PARQUET, COMPRESSION ZSTD)",
+                [datetime.datetime.utcnow(), str(path.name)])
+    rows, null_sku = con.execute(
+        f"SELECT count(*), count(*) FILTER (WHERE sku IS NULL) FROM read_parquet('{pq}')"
+    ).fetchone()
+    con.close()
+    return {"file": path.name, "parquet": str(out), "rows": rows, "null_sku": null_sku,
+            "bytes": path.stat().st_size, "secs": time.perf_counter() - t0}
+
+
+def stage_parallel(todo, out_dir, workers):
+    """Stage all pending files on a process pool. Returns {file_name: stage result}."""
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    staged = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Parquet bronze is already typed and cleaned, only CSV drops need staging
+        futures = [pool.submit(stage_file, path, out_dir, threads) for path, *_ in todo if path.suffix == ".csv"]
+        for fut in as_completed(futures):
+            r = fut.result()
+            if r["rows"] == 0 or r["null_sku"] == r["rows"]:
+                raise SystemExit(f"Validation failed for {r['file']}: {r['rows']} rows, {r['null_sku']} without sku")
+            staged[r["file"]] = r
+            print(f"Staged {r['file']}: {r['rows']} rows in {r['secs']:.2f}s "
+                  f"({r['rows'] / r['secs']:,.0f} rows/s, {r['bytes'] / r['secs'] / 1e6:.1f} MB/s)")
+    return staged
+
+
+def load_parquet(con, path):
+    """Bulk-append an already cleaned Parquet file (bronze Parquet or a worker's staged output)."""
+    pq = str(path).replace("'", "''")
+    cols_sql = ", ".join(cols + ["ingest_ts", "source_file"])
+    return con.execute(
+        f"INSERT INTO raw_supply_chain SELECT {cols_sql} FROM read_parquet('{pq}', hive_partitioning = false)"
+    ).fetchone()[0]
+
+
+def load_staged(staged):
+    """Loader for ingest(): CSVs come from the workers' Parquet output, Parquet bronze loads directly."""
+    def loader(con, path):
+        if path.name in staged:
+            return load_parquet(con, staged[path.name]["parquet"])
+        return load_parquet(con, path)
+    return loader
+
 
 # try common separators: comma, tab, whitespace
 def try_read(path):
@@ -21,51 +204,118 @@ def try_read(path):
             continue
     raise SystemExit("Failed to read CSV with common separators.")
 
-df = try_read(LATEST)
 
-# if header missing (we expect 24 cols), set column names
-cols = ["product_category","sku","price","availability","number_of_products_sold","revenue_generated",
-        "customer_demographics","stock_levels","supplier_lead_time_days","order_quantities","shipping_times",
-        "shipping_carrier","shipping_costs","supplier_name","supplier_city","lead_time_meta",
-        "production_volumes","manufacturing_lead_time","manufacturing_costs","inspection_results",
-        "defect_rates","transportation_modes","routes","transport_costs"]
-if df.shape[1] == len(cols):
-    df.columns = cols
-else:
-    # try if first row is header
-    print("Detected column count:", df.shape[1], "expected", len(cols))
-    if df.shape[1] > len(cols):
-        # keep first len(cols)
-        df = df.iloc[:, :len(cols)]
+def load_pandas(con, path):
+    """Legacy loader: parse and clean in pandas, then append. Returns the number of rows written."""
+    if path.suffix == ".parquet":
+        return load_parquet(con, path)
+    df = try_read(path)
+
+    # if header missing (we expect 24 cols), set column names
+    if df.shape[1] == len(cols):
         df.columns = cols
     else:
-        raise SystemExit("Unexpected column count; adjust code to match CSV layout.")
-
-# basic cleaning
-df = df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
-df['price'] = pd.to_numeric(df['price'], errors='coerce')
-df['revenue_generated'] = pd.to_numeric(df['revenue_generated'], errors='coerce')
-df['number_of_products_sold'] = pd.to_numeric(df['number_of_products_sold'], errors='coerce', downcast='integer')
-df['stock_levels'] = pd.to_numeric(df['stock_levels'], errors='coerce', downcast='integer')
-df['supplier_lead_time_days'] = pd.to_numeric(df['supplier_lead_time_days'], errors='coerce', downcast='integer')
-df['shipping_times'] = pd.to_numeric(df['shipping_times'], errors='coerce', downcast='integer')
-df['shipping_costs'] = pd.to_numeric(df['shipping_costs'], errors='coerce')
-df['production_volumes'] = pd.to_numeric(df['production_volumes'], errors='coerce', downcast='integer')
-df['manufacturing_lead_time'] = pd.to_numeric(df['manufacturing_lead_time'], errors='coerce', downcast='integer')
-df['manufacturing_costs'] = pd.to_numeric(df['manufacturing_costs'], errors='coerce')
-df['defect_rates'] = pd.to_numeric(df['defect_rates'], errors='coerce')
-
-df['inspection_results'] = df['inspection_results'].str.lower().replace({'pending':'pending','pass':'pass','fail':'fail'})
-df['customer_demographics'] = df['customer_demographics'].fillna('unknown').str.lower()
-
-df['ingest_ts'] = datetime.datetime.utcnow()
-df['source_file'] = str(LATEST.name)
-
-# write to DuckDB
-con = duckdb.connect(database='warehouse/supply_chain.duckdb', read_only=False)
-# create table if not exists and append
-con.execute("CREATE TABLE IF NOT EXISTS raw_supply_chain AS SELECT * FROM df WHERE 1=0")
-con.append('raw_supply_chain', df)
-con.commit()
-print("Wrote", len(df), "rows to raw_supply_chain in warehouse/supply_chain.duckdb")
-con.close()
+        # try if first row is header
+        print("Detected column count:", df.shape[1], "expected", len(cols))
+        if df.shape[1] > len(cols):
+            # keep first len(cols)
+            df = df.iloc[:, :len(cols)]
+            df.columns = cols
+        else:
+            raise SystemExit("Unexpected column count; adjust code to match CSV layout.")
+
+    # basic cleaning
+    df = df.map(lambda x: x.strip() if isinstance(x, str) else x)
+    df['price'] = pd.to_numeric(df['price'], errors='coerce')
+    df['revenue_generated'] = pd.to_numeric(df['revenue_generated'], errors='coerce')
+    df['number_of_products_sold'] = pd.to_numeric(df['number_of_products_sold'], errors='coerce', downcast='integer')
+    df['stock_levels'] = pd.to_numeric(df['stock_levels'], errors='coerce', downcast='integer')
+    df['supplier_lead_time_days'] = pd.to_numeric(df['supplier_lead_time_days'], errors='coerce', downcast='integer')
+    df['shipping_times'] = pd.to_numeric(df['shipping_times'], errors='coerce', downcast='integer')
+    df['shipping_costs'] = pd.to_numeric(df['shipping_costs'], errors='coerce')
+    df['production_volumes'] = pd.to_numeric(df['production_volumes'], errors='coerce', downcast='integer')
+    df['manufacturing_lead_time'] = pd.to_numeric(df['manufacturing_lead_time'], errors='coerce', downcast='integer')
+    df['manufacturing_costs'] = pd.to_numeric(df['manufacturing_costs'], errors='coerce')
+    df['defect_rates'] = pd.to_numeric(df['defect_rates'], errors='coerce')
+
+    df['inspection_results'] = df['inspection_results'].str.lower().replace({'pending':'pending','pass':'pass','fail':'fail'})
+    df['customer_demographics'] = df['customer_demographics'].fillna('unknown').str.lower()
+
+    df['ingest_ts'] = datetime.datetime.utcnow()
+    df['source_file'] = str(path.name)
+
+    con.append('raw_supply_chain', df)
+    return len(df)
+
+
+def ingest(con, todo, loader):
+    """Load every pending file in one transaction, replacing rows of files that changed."""
+    loaded = []
+    con.execute("BEGIN TRANSACTION")
+    try:
+        for path, size, mtime, digest in todo:
+            t0 = time.perf_counter()
+            # idempotent per file: drop whatever an earlier (or pre-manifest) run left behind
+            con.execute("DELETE FROM raw_supply_chain WHERE source_file = ?", [path.name])
+            n = loader(con, path)
+            con.execute("INSERT OR REPLACE INTO bronze_load_manifest VALUES (?, ?, ?, ?, ?, ?)",
+                        [path.name, size, mtime, digest, n, datetime.datetime.utcnow()])
+            loaded.append((path.name, n, time.perf_counter() - t0))
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+    return loaded
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Load new or changed bronze files (CSV or Parquet) into raw_supply_chain.")
+    ap.add_argument("--mode", choices=["duckdb", "pandas"], default="duckdb",
+                    help="duckdb: stream read_csv -> raw_supply_chain in SQL (default); pandas: legacy loader")
+    ap.add_argument("--db", default=DB_PATH)
+    ap.add_argument("--threads", type=int, default=None, help="DuckDB threads (default: all cores)")
+    ap.add_argument("--memory-limit", default=None, help="DuckDB memory_limit, e.g. 2GB")
+    ap.add_argument("--latest-only", action="store_true", help="only consider the newest bronze file")
+    ap.add_argument("--workers", type=int, default=1,
+                    help="parse/validate files on N worker processes, then bulk-append from one writer")
+    args = ap.parse_args()
+    if args.workers > 1 and args.mode == "pandas":
+        ap.error("--workers requires --mode duckdb")
+
+    files = sorted(list(BRONZE.glob("supply_chain_raw__*.csv"))
+                   + list(BRONZE.glob("ingest_date=*/supply_chain_raw__*.parquet")),
+                   key=lambda p: p.name)
+    if not files:
+        raise SystemExit("No bronze files found. Run ingest first.")
+    if args.latest_only:
+        files = files[-1:]
+
+    # write to DuckDB
+    con = duckdb.connect(database=args.db, read_only=False)
+    configure(con, args.threads, args.memory_limit)
+    con.execute(raw_table_ddl())
+    con.execute(MANIFEST_DDL)
+
+    todo = pending_files(con, files)
+    if not todo:
+        print(f"Nothing to load: {len(files)} bronze file(s) already in bronze_load_manifest.")
+        con.close()
+        return
+
+    if args.workers > 1 and len(todo) > 1:
+        with tempfile.TemporaryDirectory(prefix="bronze_stage_") as tmp:
+            t0 = time.perf_counter()
+            staged = stage_parallel(todo, tmp, min(args.workers, len(todo)))
+            print(f"Staged {len(staged)} file(s) on {args.workers} workers in {time.perf_counter() - t0:.2f}s")
+            for name, n, secs in ingest(con, todo, load_staged(staged)):
+                print(f"Appended {name}: {n} rows ({secs:.2f}s)")
+    else:
+        loader = load_pandas if args.mode == "pandas" else load_duckdb
+        for name, n, secs in ingest(con, todo, loader):
+            print(f"Loaded {name}: {n} rows ({secs:.2f}s, mode={args.mode})")
+    print(f"Wrote {len(todo)} file(s) to raw_supply_chain in {args.db}")
+    con.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+# scripts/compact_warehouse.py
+"""Maintenance for raw_supply_chain and storage/bronze: dedupe, archive, re-sort, reclaim space.
+
+raw_supply_chain only grows by appends, so over time it collects duplicate loads of the same
+file and row groups in load order with wide min/max ranges. One run:
+
+  1. archives rows with ingest_ts older than --retention-days to zstd Parquet under
+     --archive-dir/ingest_date=YYYY-MM-DD/ (same columns as the bronze Parquet layer, so
+     `raw_external_location` can point at bronze and archive together)
+  2. keeps one row per (sku, source_file), the one from the latest load
+  3. rewrites the remaining rows ordered by sku, ingest_ts so zone maps prune sku and
+     ingest_ts filters, then CHECKPOINT + VACUUM ANALYZE
+  4. with --compact-file, copies the database into a fresh file (DuckDB does not shrink a
+     file in place) and swaps it in under the same name
+  5. with --prune-bronze, deletes bronze files older than the horizon whose rows are no
+     longer in raw_supply_chain (they live in the archive now)
+
+Only rows of files already built into fact_sales are archived, and only once fact_sales
+carries the slice and feature attributes of its staged rows (FACT_ATTRIBUTES): the marts,
+the dashboard and the ML queries then read facts alone, and incremental builds of
+dim_product_current keep their rows. A --full-refresh and the staging views
+(stg_supply_chain, dim_product) only see what is left in raw_supply_chain; to rebuild from
+everything, point `raw_external_location` at bronze and the archive.
+
+It reports bytes reclaimed and the scan timings it measured before and after. The run
+holds the same lock as dbt_refresh.py, and inside publish_warehouse.py it works on the
+staging copy:
+
+    python scripts/compact_warehouse.py --retention-days 365 --compact-file --prune-bronze
+    python scripts/publish_warehouse.py -- python scripts/compact_warehouse.py --compact-file
+"""
+import argparse, datetime, os, pathlib, shutil, tempfile, time
+import duckdb
+from bronze_to_duckdb import BRONZE, DB_PATH, cols, configure
+from dbt_refresh import WriteLock
+
+ARCHIVE_DIR = pathlib.Path("storage/archive/raw_supply_chain")
+
+# staged columns fact_sales must carry before raw rows can leave the warehouse
+FACT_ATTRIBUTES = ["product_category", "supplier_name", "transport_mode", "shipping_carrier", "route",
+                   "defect_rate", "shipping_cost", "transport_cost", "supplier_lead_time_days",
+                   "shipping_time_days", "mfg_lead_time_days", "source_loaded_at"]
+
+# older than the cutoff (the one parameter) and from a file fact_sales was last built from
+ARCHIVABLE = """coalesce(ingest_ts < ? AND source_file IN (
+    SELECT file_name FROM bronze_load_manifest
+    WHERE loaded_at <= (SELECT max(source_loaded_at) FROM fact_sales)), false)"""
+
+# representative reads: a full aggregate scan, an sku lookup and a recent-window filter
+SCAN_PROBES = {
+    "full_scan": "SELECT count(*), sum(revenue_generated), avg(defect_rates) FROM raw_supply_chain",
+    "sku_lookup": "SELECT count(*), max(ingest_ts) FROM raw_supply_chain "
+                  "WHERE sku = (SELECT min(sku) FROM raw_supply_chain)",
+    "recent_window": "SELECT sku, count(*) FROM raw_supply_chain "
+                     "WHERE ingest_ts >= (SELECT max(ingest_ts) FROM raw_supply_chain) - INTERVAL 1 DAY "
+                     "GROUP BY sku",
+}
+
+
+def db_bytes(db):
+    return sum(os.path.getsize(p) for p in (db, db + ".wal") if os.path.exists(p))
+
+
+def time_scans(con, repeat=5):
+    """Best-of-`repeat` seconds for each SCAN_PROBES query."""
+    timings = {}
+    for name, sql in SCAN_PROBES.items():
+        best = None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            con.execute(sql).fetchall()
+            secs = time.perf_counter() - t0
+            best = secs if best is None else min(best, secs)
+        timings[name] = best
+    return timings
+
+
+def missing_fact_attributes(con):
+    """FACT_ATTRIBUTES fact_sales lacks (all of them when it has not been built)."""
+    have = {r[0] for r in con.execute(
+        "SELECT column_name FROM duckdb_columns() WHERE schema_name = 'main' AND table_name = 'fact_sales'"
+    ).fetchall()}
+    return [c for c in FACT_ATTRIBUTES if c not in have]
+
+
+def archive_old_rows(con, cutoff, archive_dir):
+    """COPY archivable rows older than `cutoff`, deduped like the table, to partitioned Parquet.
+
+    Returns (rows archivable, rows written).
+    """
+    n = con.execute(f"SELECT count(*) FROM raw_supply_chain WHERE {ARCHIVABLE}", [cutoff]).fetchone()[0]
+    if not n:
+        return 0, 0
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    cols_sql = ", ".join(cols + ["ingest_ts", "source_file"])
+    out = str(archive_dir).replace("'", "''")
+    # unique file names per run, so earlier archives in the same partition are never overwritten
+    written = con.execute(f"""
+        COPY (
+            SELECT {cols_sql}, strftime(ingest_ts, '%Y-%m-%d') AS ingest_date
+            FROM raw_supply_chain WHERE {ARCHIVABLE}
+            QUALIFY row_number() OVER (PARTITION BY sku, source_file ORDER BY ingest_ts DESC) = 1
+            ORDER BY sku, ingest_ts
+        ) TO '{out}' (FORMAT PARQUET, COMPRESSION ZSTD, PARTITION_BY (ingest_date),
+                      FILENAME_PATTERN 'raw_{{uuid}}', APPEND)
+    """, [cutoff]).fetchone()[0]
+    return n, written
+
+
+def rewrite_sorted(con, cutoff):
+    """Replace raw_supply_chain with its deduped, unarchived rows ordered by sku, ingest_ts.
+
+    Returns (rows before, rows after).
+    """
+    before = con.execute("SELECT count(*) FROM raw_supply_chain").fetchone()[0]
+    keep = f"WHERE NOT {ARCHIVABLE}" if cutoff else ""
+    con.execute("BEGIN TRANSACTION")
+    try:
+        con.execute(f"""
+            CREATE TABLE raw_supply_chain__compact AS
+            SELECT * FROM raw_supply_chain {keep}
+            QUALIFY row_number() OVER (PARTITION BY sku, source_file ORDER BY ingest_ts DESC) = 1
+            ORDER BY sku, ingest_ts
+        """, [cutoff] if cutoff else [])
+        con.execute("DROP TABLE raw_supply_chain")
+        con.execute("ALTER TABLE raw_supply_chain__compact RENAME TO raw_supply_chain")
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+    after = con.execute("SELECT count(*) FROM raw_supply_chain").fetchone()[0]
+    return before, after
+
+
+def compact_file(con, db):
+    """Copy every object into a fresh file and swap it in; returns a connection to the new file.
+
+    The copy keeps the file name, because dbt-duckdb views reference the catalog (file stem).
+    """
+    catalog = con.execute("SELECT current_database()").fetchone()[0]
+    tmp_dir = tempfile.mkdtemp(prefix=".compact_", dir=os.path.dirname(db))
+    tmp = os.path.join(tmp_dir, os.path.basename(db))
+    try:
+        con.execute(f"ATTACH '{tmp}' AS compact_target")
+        con.execute(f'COPY FROM DATABASE "{catalog}" TO compact_target')
+        con.execute("DETACH compact_target")
+        con.close()
+        os.replace(tmp, db)
+        if os.path.exists(db + ".wal"):
+            os.remove(db + ".wal")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return duckdb.connect(db)
+
+
+def prune_bronze(con, cutoff):
+    """Delete bronze files loaded before `cutoff` that no longer have rows in raw_supply_chain."""
+    live = {r[0] for r in con.execute("SELECT DISTINCT source_file FROM raw_supply_chain").fetchall()}
+    old = {r[0] for r in con.execute(
+        "SELECT file_name FROM bronze_load_manifest WHERE loaded_at < ?", [cutoff]).fetchall()}
+    removed, freed = [], 0
+    for path in sorted(list(BRONZE.glob("supply_chain_raw__*.csv"))
+                       + list(BRONZE.glob("ingest_date=*/supply_chain_raw__*.parquet"))):
+        if path.name in old and path.name not in live:
+            freed += path.stat().st_size
+            path.unlink()
+            removed.append(path.name)
+    for part in BRONZE.glob("ingest_date=*"):
+        if part.is_dir() and not any(part.iterdir()):
+            part.rmdir()
+    return removed, freed
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Dedupe, archive and re-sort raw_supply_chain, then reclaim space.")
+    ap.add_argument("--db", default=DB_PATH)
+    ap.add_argument("--retention-days", type=float, default=None,
+                    help="archive raw rows (and with --prune-bronze, bronze files) older than this")
+    ap.add_argument("--archive-dir", type=pathlib.Path, default=ARCHIVE_DIR)
+    ap.add_argument("--compact-file", action="store_true",
+                    help="copy the database into a fresh file to return freed blocks to the OS")
+    ap.add_argument("--prune-bronze", action="store_true",
+                    help="delete bronze files older than the horizon whose rows were archived")
+    ap.add_argument("--threads", type=int, default=None, help="DuckDB threads (default: all cores)")
+    ap.add_argument("--memory-limit", default=None, help="DuckDB memory_limit, e.g. 2GB")
+    args = ap.parse_args()
+    if args.prune_bronze and args.retention_days is None:
+        ap.error("--prune-bronze requires --retention-days")
+
+    db = os.path.abspath(args.db)
+    if not os.path.exists(db):
+        raise SystemExit(f"{db} does not exist.")
+    cutoff = None
+    if args.retention_days is not None:
+        cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=args.retention_days)
+
+    with WriteLock(db):
+        size_before = db_bytes(db)
+        con = duckdb.connect(db)
+        configure(con, args.threads, args.memory_limit)
+        missing = missing_fact_attributes(con) if cutoff else []
+        if missing:
+            con.close()
+            raise SystemExit(f"fact_sales lacks {', '.join(missing)}; archiving raw rows would break the "
+                             "marts and dashboard. Run `dbt run --full-refresh -s fact_sales+` first.")
+        # the rewrite is ORDER BY sku, ingest_ts: keep that order in the stored row groups
+        con.execute("SET preserve_insertion_order = true")
+        scans_before = time_scans(con)
+
+        t0 = time.perf_counter()
+        archived, written = archive_old_rows(con, cutoff, args.archive_dir) if cutoff else (0, 0)
+        before, after = rewrite_sorted(con, cutoff)
+        con.execute("CHECKPOINT")
+        con.execute("VACUUM ANALYZE raw_supply_chain")
+        if args.compact_file:
+            con = compact_file(con, db)
+        print(f"Rewrote raw_supply_chain in {time.perf_counter() - t0:.2f}s: {before} -> {after} rows "
+              f"({archived} archived, {before - archived - after} duplicates dropped)")
+        if archived:
+            print(f"Archived {written} of {archived} rows older than {cutoff:%Y-%m-%d %H:%M} "
+                  f"(after dedupe) to {args.archive_dir}")
+        if cutoff:
+            held = con.execute("SELECT count(*) FROM raw_supply_chain WHERE ingest_ts < ?", [cutoff]).fetchone()[0]
+            if held:
+                print(f"Kept {held} older rows whose files are not built into fact_sales yet")
+
+        scans_after = time_scans(con)
+        if args.prune_bronze:
+            removed, freed = prune_bronze(con, cutoff)
+            print(f"Pruned {len(removed)} bronze file(s), {freed / 1e6:.1f} MB")
+        con.close()
+        size_after = db_bytes(db)
+
+    print(f"\nDatabase: {size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB "
+          f"({(size_before - size_after) / 1e6:.1f} MB reclaimed)")
+    print(f"{'scan':<16} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+    for name in SCAN_PROBES:
+        b, a = scans_before[name], scans_after[name]
+        print(f"{name:<16} {b * 1000:>10.2f} {a * 1000:>10.2f} {b / a if a else float('inf'):>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
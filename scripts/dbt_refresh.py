@@ -0,0 +1,185 @@
+# scripts/dbt_refresh.py
+"""Change-aware dbt refresh: build only models whose inputs changed since their last build.
+
+Every model gets two fingerprints from dbt's manifest:
+  definition  its SQL checksum, config and the project macros it calls
+  data        definition + the data fingerprints of its parents, where a source's data
+              fingerprint is the bronze load manifest (files, hashes, load times)
+Views are rebuilt when their definition changes; tables and incremental models when their
+data fingerprint changes, i.e. when new bronze files landed or anything upstream changed.
+The selected models run in one `dbt run --threads N`, so independent branches build
+concurrently on dbt-duckdb's single shared connection; a lock file keeps two refreshes
+from writing to the same database at once.
+"""
+import argparse, datetime, hashlib, json, os, pathlib, shutil, subprocess, sys, time
+import duckdb
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+PROJECT_DIR = ROOT / "dbt" / "supply_chain"
+PROFILES_DIR = ROOT / "dbt"
+DB_PATH = os.environ.get("SUPPLY_CHAIN_DB", "warehouse/supply_chain.duckdb")
+# build fingerprints live next to the database they describe, so they travel with its copies
+STATE_SUFFIX = ".refresh_state.json"
+REBUILD_ON_DATA = {"table", "incremental"}
+
+# bronze manifest summary (falls back to the raw table for warehouses loaded before it existed)
+SOURCE_PROBES = [
+    "SELECT count(*), max(loaded_at), md5(string_agg(file_name || ':' || content_hash, ',' ORDER BY file_name)) "
+    "FROM bronze_load_manifest",
+    "SELECT count(*), max(ingest_ts) FROM raw_supply_chain",
+]
+
+
+def _sha(*parts):
+    return hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+
+def dbt_cmd(*args, target_path, threads=None):
+    cmd = [shutil.which("dbt") or "dbt", *args, "--project-dir", str(PROJECT_DIR),
+           "--profiles-dir", str(PROFILES_DIR), "--target-path", str(target_path)]
+    if threads:
+        cmd += ["--threads", str(threads)]
+    return cmd
+
+
+def source_fingerprint(db):
+    if not os.path.exists(db):
+        return None
+    con = duckdb.connect(db, read_only=True)
+    try:
+        for sql in SOURCE_PROBES:
+            try:
+                return _sha(con.execute(sql).fetchone())
+            except duckdb.CatalogException:
+                continue
+        return None
+    finally:
+        con.close()
+
+
+def existing_relations(db):
+    if not os.path.exists(db):
+        return set()
+    con = duckdb.connect(db, read_only=True)
+    try:
+        return {r[0] for r in con.execute(
+            "SELECT table_name FROM duckdb_tables() UNION ALL SELECT view_name FROM duckdb_views()").fetchall()}
+    finally:
+        con.close()
+
+
+def fingerprints(manifest, source_fp):
+    """{unique_id: (name, materialized, definition_fp, data_fp)} for every enabled model."""
+    models = {k: n for k, n in manifest["nodes"].items() if n["resource_type"] == "model"}
+    macros = manifest.get("macros", {})
+    project = manifest.get("metadata", {}).get("project_name")
+    out = {}
+
+    def visit(uid):
+        if uid in out:
+            return out[uid][3]
+        if uid.startswith("source."):
+            return source_fp
+        if uid not in models:
+            return None
+        node = models[uid]
+        own_macros = [macros[m]["macro_sql"] for m in sorted(node["depends_on"]["macros"])
+                      if m in macros and macros[m].get("package_name") in (project, node["package_name"])]
+        definition = _sha(node["checksum"]["checksum"], json.dumps(node["config"], sort_keys=True, default=str),
+                          *own_macros)
+        parents = [visit(p) for p in sorted(node["depends_on"]["nodes"])]
+        data = _sha(definition, *parents)
+        out[uid] = (node["name"], node["config"].get("materialized"), definition, data)
+        return data
+
+    for uid in models:
+        visit(uid)
+    return out
+
+
+def plan(models, state, relations):
+    """Models to build now and why; the rest are up to date."""
+    todo = {}
+    for uid, (name, materialized, definition, data) in models.items():
+        prev = state.get(uid, {})
+        if name not in relations:
+            todo[uid] = "missing"
+        elif prev.get("definition") != definition:
+            todo[uid] = "definition changed"
+        elif materialized in REBUILD_ON_DATA and prev.get("data") != data:
+            todo[uid] = "upstream data changed"
+    return todo
+
+
+class WriteLock:
+    """Exclusive lock file next to the database for the duration of a refresh."""
+
+    def __init__(self, db):
+        self.path = str(db) + ".refresh.lock"
+
+    def __enter__(self):
+        try:
+            fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            raise SystemExit(f"Another refresh holds {self.path}; remove it if that run died.")
+        with os.fdopen(fd, "w") as f:
+            f.write(f"{os.getpid()} {datetime.datetime.utcnow().isoformat()}Z\n")
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Run only the dbt models whose SQL or upstream data changed.")
+    ap.add_argument("--db", default=DB_PATH, help="warehouse DuckDB file (also passed to dbt as SUPPLY_CHAIN_DB)")
+    ap.add_argument("--threads", type=int, default=os.cpu_count(), help="dbt threads for independent branches")
+    ap.add_argument("--target-path", type=pathlib.Path, default=PROJECT_DIR / "target")
+    ap.add_argument("--full", action="store_true", help="build every model regardless of fingerprints")
+    ap.add_argument("--dry-run", action="store_true", help="print the plan without running dbt")
+    args = ap.parse_args()
+
+    db = os.path.abspath(args.db)
+    env = dict(os.environ, SUPPLY_CHAIN_DB=db, DBT_THREADS=str(args.threads))
+    state_path = pathlib.Path(db + STATE_SUFFIX)
+
+    t0 = time.perf_counter()
+    subprocess.run(dbt_cmd("parse", target_path=args.target_path), env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+    manifest = json.loads((args.target_path / "manifest.json").read_text(encoding="utf-8"))
+    models = fingerprints(manifest, source_fingerprint(db))
+    state = json.loads(state_path.read_text(encoding="utf-8")) if state_path.exists() else {}
+    todo = {uid: "--full" for uid in models} if args.full else plan(models, state, existing_relations(db))
+    print(f"Planned in {time.perf_counter() - t0:.2f}s: {len(todo)} of {len(models)} model(s) to build")
+    for uid, reason in sorted(todo.items()):
+        print(f"  {models[uid][0]:<36} {reason}")
+    if not todo or args.dry_run:
+        return
+
+    with WriteLock(db):
+        select = [models[uid][0] for uid in todo]
+        t0 = time.perf_counter()
+        proc = subprocess.run(dbt_cmd("run", "--select", *select, target_path=args.target_path,
+                                      threads=args.threads), env=env)
+        elapsed = time.perf_counter() - t0
+
+    results = json.loads((args.target_path / "run_results.json").read_text(encoding="utf-8"))["results"]
+    print(f"\n{'model':<36} {'status':<8} {'seconds':>8}")
+    for r in sorted(results, key=lambda r: r["execution_time"], reverse=True):
+        print(f"{r['unique_id'].rsplit('.', 1)[-1]:<36} {r['status']:<8} {r['execution_time']:>8.2f}")
+        if r["status"] == "success" and r["unique_id"] in models:
+            _, _, definition, data = models[r["unique_id"]]
+            state[r["unique_id"]] = {"definition": definition, "data": data,
+                                     "built_at": datetime.datetime.utcnow().isoformat() + "Z"}
+    print(f"dbt run: {elapsed:.2f}s wall for {len(results)} model(s) on {args.threads} thread(s)")
+
+    state_path.write_text(json.dumps(state, indent=2), encoding="utf-8")
+    if proc.returncode != 0:
+        sys.exit(proc.returncode)
+
+
+if __name__ == "__main__":
+    main()
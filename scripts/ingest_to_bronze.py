@@ -1,11 +1,53 @@
-import shutil, datetime, pathlib, sys
+import argparse, shutil, datetime, pathlib
+import duckdb
+from bronze_to_duckdb import clean_select_sql, read_csv_sql
 
-SRC = pathlib.Path("T:\supply-chain-lakehouse\data_raw\supply_chain_data.csv")
+SRC = pathlib.Path(r"T:\supply-chain-lakehouse\data_raw\supply_chain_data.csv")
 DST_DIR = pathlib.Path("storage/bronze")
-DST_DIR.mkdir(parents=True, exist_ok=True)
 
 
-ts = datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-dst = DST_DIR / f"supply_chain_raw__{ts}.csv"
-shutil.copy(SRC, dst)
-print(f"Copied {SRC} -> {dst}")
\ No newline at end of file
+def write_parquet(src, dst_dir, now, row_group_size=122880):
+    """Write `src` as cleaned, typed, zstd Parquet under dst_dir/ingest_date=YYYY-MM-DD/.
+
+    Rows are sorted by sku so the per-row-group min/max stats in the footer stay tight and
+    DuckDB can skip row groups as well as whole ingest_date partitions.
+    """
+    part = dst_dir / f"ingest_date={now:%Y-%m-%d}"
+    part.mkdir(parents=True, exist_ok=True)
+    dst = part / f"supply_chain_raw__{now:%Y%m%dT%H%M%SZ}.parquet"
+    tmp = dst.with_suffix(".parquet.tmp")
+
+    con = duckdb.connect()
+    sql = clean_select_sql(read_csv_sql(con, src)) + "\nORDER BY sku"
+    pq = str(tmp).replace("'", "''")
+    con.execute(f"COPY ({sql}) TO '{pq}' (FORMAT PARQUET, COMPRESSION ZSTD, ROW_GROUP_SIZE {row_group_size})",
+                [now, dst.name])
+    n = con.execute(f"SELECT count(*) FROM read_parquet('{pq}')").fetchone()[0]
+    con.close()
+    # publish only complete files so readers globbing the partition never see a partial write
+    tmp.replace(dst)
+    return dst, n
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Land the raw supply chain CSV in the bronze layer.")
+    ap.add_argument("--src", type=pathlib.Path, default=SRC)
+    ap.add_argument("--format", choices=["parquet", "csv"], default="parquet",
+                    help="parquet: typed zstd Parquet partitioned by ingest_date (default); csv: plain copy")
+    args = ap.parse_args()
+
+    DST_DIR.mkdir(parents=True, exist_ok=True)
+    now = datetime.datetime.utcnow().replace(microsecond=0)
+
+    if args.format == "csv":
+        dst = DST_DIR / f"supply_chain_raw__{now:%Y%m%dT%H%M%SZ}.csv"
+        shutil.copy(args.src, dst)
+        print(f"Copied {args.src} -> {dst}")
+        return
+
+    dst, n = write_parquet(args.src, DST_DIR, now)
+    print(f"Wrote {n} rows {args.src} -> {dst}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# scripts/publish_warehouse.py
+"""Blue/green publish: writers build a staging copy, readers only ever see finished snapshots.
+
+Layout under --snapshot-dir (default warehouse/snapshots):
+
+    v20250101T120000Z/supply_chain.duckdb   immutable once published
+    CURRENT                                 "<version>/supply_chain.duckdb", swapped atomically
+
+A publish copies the current snapshot (or --seed-db the first time) into <version>.staging/,
+runs the writer steps against it with SUPPLY_CHAIN_DB pointing there, checkpoints it, renames
+the directory to <version> and replaces CURRENT. Readers (the app with
+SUPPLY_CHAIN_SNAPSHOT_DIR set) open the current snapshot read-only and switch on their next
+query, so a running build never locks them out. Snapshots beyond --keep that are older than
+--retention-hours are removed.
+
+    python scripts/publish_warehouse.py                       # bronze_to_duckdb + dbt_refresh
+    python scripts/publish_warehouse.py -- python scripts/bronze_to_duckdb.py --workers 4
+"""
+import argparse, datetime, os, pathlib, shutil, subprocess, sys, time
+import duckdb
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+SNAPSHOT_DIR = pathlib.Path(os.environ.get("SUPPLY_CHAIN_SNAPSHOT_DIR", "warehouse/snapshots"))
+SEED_DB = pathlib.Path("warehouse/supply_chain.duckdb")
+POINTER = "CURRENT"
+STAGING = ".staging"
+DEFAULT_STEPS = [
+    [sys.executable, str(ROOT / "scripts" / "bronze_to_duckdb.py")],
+    [sys.executable, str(ROOT / "scripts" / "dbt_refresh.py")],
+]
+
+
+def current_snapshot(snapshot_dir):
+    """Path of the published database named by CURRENT, or None before the first publish."""
+    try:
+        rel = (snapshot_dir / POINTER).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+    return snapshot_dir / rel if rel else None
+
+
+def _write_atomic(path, text):
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def new_version(snapshot_dir):
+    base = f"v{datetime.datetime.utcnow():%Y%m%dT%H%M%SZ}"
+    version, n = base, 1
+    while (snapshot_dir / version).exists() or (snapshot_dir / (version + STAGING)).exists():
+        n += 1
+        version = f"{base}-{n}"
+    return version
+
+
+def stage(snapshot_dir, seed_db, version):
+    """Copy the current snapshot (db + sidecar files) into <version>.staging/; return the db path there."""
+    src = current_snapshot(snapshot_dir) or seed_db
+    staging = snapshot_dir / (version + STAGING)
+    staging.mkdir(parents=True)
+    if src.exists():
+        # keep the file name: dbt-duckdb views reference the catalog, which is the file stem
+        for f in src.parent.iterdir():
+            if f.is_file() and f.name.startswith(src.name) and not f.name.endswith(".lock"):
+                shutil.copy2(f, staging / f.name)
+    return staging / src.name
+
+
+def publish(snapshot_dir, db):
+    """Checkpoint the staged database, move it into place and swap CURRENT to it."""
+    con = duckdb.connect(str(db))
+    con.execute("CHECKPOINT")
+    con.close()
+    staging = db.parent
+    final = staging.with_name(staging.name[:-len(STAGING)])
+    staging.rename(final)
+    _write_atomic(snapshot_dir / POINTER, f"{final.name}/{db.name}")
+    return final / db.name
+
+
+def cleanup(snapshot_dir, keep, retention_hours):
+    """Remove snapshots (and abandoned staging dirs) beyond the newest `keep` once older than the window."""
+    current = current_snapshot(snapshot_dir)
+    current_dir = current.parent.name if current else None
+    cutoff = time.time() - retention_hours * 3600
+    dirs = sorted((d for d in snapshot_dir.iterdir() if d.is_dir()), key=lambda d: d.name, reverse=True)
+    published = [d for d in dirs if not d.name.endswith(STAGING)]
+    removed = []
+    for d in dirs:
+        if d.name == current_dir or d in published[:keep] or d.stat().st_mtime > cutoff:
+            continue
+        try:
+            shutil.rmtree(d)
+            removed.append(d.name)
+        except OSError as e:
+            # a reader may still hold an old snapshot open (Windows); retry on the next publish
+            print(f"Could not remove {d.name} yet: {e}")
+    return removed
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build the warehouse in a staging copy and publish it atomically.")
+    ap.add_argument("--snapshot-dir", type=pathlib.Path, default=SNAPSHOT_DIR)
+    ap.add_argument("--seed-db", type=pathlib.Path, default=SEED_DB,
+                    help="database to start from when nothing has been published yet")
+    ap.add_argument("--keep", type=int, default=3, help="always keep this many newest snapshots")
+    ap.add_argument("--retention-hours", type=float, default=24.0,
+                    help="older snapshots beyond --keep are removed after this long")
+    ap.add_argument("--cleanup-only", action="store_true", help="only apply retention")
+    ap.add_argument("command", nargs=argparse.REMAINDER,
+                    help="writer command(s) after '--' (default: bronze_to_duckdb.py then dbt_refresh.py)")
+    args = ap.parse_args()
+
+    snapshot_dir = args.snapshot_dir.resolve()
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    if not args.cleanup_only:
+        steps = [args.command[1:] if args.command[:1] == ["--"] else args.command] if args.command else DEFAULT_STEPS
+
+        lock = snapshot_dir / ".publish.lock"
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            raise SystemExit(f"Another publish holds {lock}; remove it if that run died.")
+        os.close(fd)
+        try:
+            version = new_version(snapshot_dir)
+            db = stage(snapshot_dir, args.seed_db.resolve(), version)
+            print(f"Staging {version} at {db}")
+            # writers target the staging copy; SUPPLY_CHAIN_SNAPSHOT_DIR would send readers in
+            # the steps (e.g. train_model.py) to the previous snapshot instead
+            env = {k: v for k, v in os.environ.items() if k != "SUPPLY_CHAIN_SNAPSHOT_DIR"}
+            env["SUPPLY_CHAIN_DB"] = str(db)
+            for step in steps:
+                print("$", " ".join(step))
+                rc = subprocess.run(step, env=env).returncode
+                if rc != 0:
+                    shutil.rmtree(db.parent, ignore_errors=True)
+                    raise SystemExit(f"Step failed ({rc}); {version} discarded, CURRENT unchanged.")
+            published = publish(snapshot_dir, db)
+            print(f"Published {published}")
+        finally:
+            os.remove(lock)
+
+    for name in cleanup(snapshot_dir, args.keep, args.retention_hours):
+        print(f"Removed snapshot {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import sys
+from pathlib import Path
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+# export_model_sql.py -- compile the delay predictor into DuckDB SQL and check it against sklearn
+import argparse
+import os
+import time
+import duckdb
+from utils.ml import load_model, predict_delay_batch, SCORING_SQL
+from utils.ml_sql import forest_to_sql, dbt_macro, register_udf, node_count, max_abs_diff
+from utils.duckdb_conn import current_snapshot
+
+# published snapshot when running in blue/green mode (SUPPLY_CHAIN_SNAPSHOT_DIR)
+DB_PATH = current_snapshot() or os.environ.get("SUPPLY_CHAIN_DB", r"T:/supply-chain-lakehouse/warehouse/supply_chain.duckdb")
+# git-ignored: the macro is a build artifact of the registered model
+MACRO_PATH = PROJECT_ROOT.parent / "dbt" / "supply_chain" / "macros" / "generated" / "delay_probability.sql"
+# a CASE tree costs every row a walk of every node in the SQL; beyond this the UDF or
+# scripts/score_delays.py (sklearn) is the faster in-warehouse path
+MAX_NODES = 5_000
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+def main():
+    ap = argparse.ArgumentParser(description="Export the delay predictor as DuckDB SQL / UDF.")
+    ap.add_argument("--db", default=DB_PATH)
+    ap.add_argument("--macro", type=Path, default=MACRO_PATH, help="where to write the dbt macro")
+    ap.add_argument("--sample", type=int, default=100_000, help="rows used for the agreement check")
+    ap.add_argument("--tolerance", type=float, default=1e-9)
+    ap.add_argument("--max-nodes", type=int, default=MAX_NODES,
+                    help="only write the dbt macro for forests up to this many nodes")
+    args = ap.parse_args()
+
+    model = load_model()
+    nodes = node_count(model)
+    print(f"Model: {len(getattr(model, 'estimators_', [model]))} trees, {nodes:,} nodes")
+
+    con = duckdb.connect(args.db, read_only=True)
+    con.execute(f"CREATE TEMP VIEW score_features AS SELECT * FROM ({SCORING_SQL}) LIMIT {int(args.sample)}")
+    n = con.execute("SELECT count(*) FROM score_features").fetchone()[0]
+    if n == 0:
+        raise SystemExit("No rows to score — build fact_sales first.")
+
+    expr = forest_to_sql(model)
+    print(f"Generated SQL: {len(expr) / 1e6:.2f} MB")
+
+    # 1) sklearn on rows pulled out of DuckDB
+    def sklearn_path():
+        table = con.execute("SELECT * FROM score_features ORDER BY fact_id").fetch_arrow_table()
+        return predict_delay_batch(model, table)
+    ref, t_sklearn = timed(sklearn_path)
+
+    # 2) generated SQL, evaluated inside DuckDB
+    sql_probs, t_sql = timed(lambda: [r[0] for r in con.execute(
+        f"SELECT {expr} AS p FROM score_features ORDER BY fact_id").fetchall()])
+
+    # 3) vectorized Arrow UDF, evaluated inside the DuckDB query
+    register_udf(con, model)
+    udf_probs, t_udf = timed(lambda: [r[0] for r in con.execute(
+        "SELECT delay_probability(supplier_lead_time_days, defect_rate, shipping_cost) AS p "
+        "FROM score_features ORDER BY fact_id").fetchall()])
+
+    diff_sql, diff_udf = max_abs_diff(ref, sql_probs), max_abs_diff(ref, udf_probs)
+    print(f"Agreement vs predict_proba on {n:,} rows: SQL max|diff|={diff_sql:.2e}, UDF max|diff|={diff_udf:.2e}")
+    for label, secs in (("sklearn (fetch + predict_proba)", t_sklearn), ("SQL CASE", t_sql), ("Arrow UDF", t_udf)):
+        print(f"  {label:<32} {secs:8.3f}s  {n / secs if secs else 0:>12,.0f} rows/s")
+    con.close()
+
+    if max(diff_sql, diff_udf) > args.tolerance:
+        raise SystemExit(f"Export disagrees with sklearn beyond tolerance {args.tolerance}; macro not written.")
+    if nodes > args.max_nodes:
+        raise SystemExit(f"{nodes:,} nodes exceed --max-nodes {args.max_nodes:,}; macro not written. "
+                         "Score in-warehouse with scripts/score_delays.py (sklearn) instead.")
+
+    args.macro.parent.mkdir(parents=True, exist_ok=True)
+    args.macro.write_text(dbt_macro(model), encoding="utf-8")
+    print("Wrote dbt macro:", args.macro)
+    print("Build it with: dbt run --select fact_delay_scores --vars '{delay_model_exported: true}'")
+
+if __name__ == "__main__":
+    main()
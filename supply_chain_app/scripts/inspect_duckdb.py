@@ -38,13 +38,13 @@ for schema, table in tables:
     except Exception as e:
         # fallback: select * limit 0
         try:
-            df = con.execute(f"SELECT * FROM {schema}.{table} LIMIT 0").fetchdf()
-            safe_print(f'COLS (fallback): {schema}.{table}', df.columns.tolist())
+            cur = con.execute(f"SELECT * FROM {schema}.{table} LIMIT 0")
+            safe_print(f'COLS (fallback): {schema}.{table}', [d[0] for d in cur.description])
         except Exception as e2:
             safe_print(f'ERROR reading columns for {schema}.{table}', str(e2))
 
 # 3) show a tiny sample (3 rows) for each relevant table to inspect types/content
-relevant = ['raw_supply_chain','stg_supply_chain','fact_sales','dim_product','dim_supplier','mart_supply_chain_performance']
+relevant = ['raw_supply_chain','stg_supply_chain','fact_sales','dim_product','dim_product_current','dim_supplier','mart_supply_chain_performance']
 for t in relevant:
     try:
         # find schema for this table
@@ -53,8 +53,8 @@ for t in relevant:
         if res:
             schema = res[0]
             # Menggunakan f-string untuk query SELECT *
-            sample = con.execute(f"SELECT * FROM {schema}.{t} LIMIT 3").fetchdf()
-            safe_print(f'SAMPLE: {schema}.{t}', sample.to_dict(orient='records'))
+            sample = con.execute(f"SELECT * FROM {schema}.{t} LIMIT 3").fetch_arrow_table()
+            safe_print(f'SAMPLE: {schema}.{t}', sample.to_pylist())
         else:
             safe_print(f'SAMPLE: {t}', 'TABLE NOT FOUND')
     except Exception as e:
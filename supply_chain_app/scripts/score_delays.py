@@ -0,0 +1,38 @@
+import sys
+from pathlib import Path
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+# score_delays.py -- batch-score every fact into delay_predictions
+import argparse
+import os
+import time
+import duckdb
+from utils.duckdb_conn import fetch_batches
+from utils.ml import load_model, score_to_table, SCORING_SQL
+
+DB_PATH = os.environ.get("SUPPLY_CHAIN_DB", r"T:/supply-chain-lakehouse/warehouse/supply_chain.duckdb")
+
+def main():
+    ap = argparse.ArgumentParser(description="Score all facts with the delay predictor.")
+    ap.add_argument("--db", default=DB_PATH)
+    ap.add_argument("--table", default="delay_predictions")
+    ap.add_argument("--chunk-size", type=int, default=100_000, help="rows per scoring chunk")
+    args = ap.parse_args()
+
+    model = load_model()
+    con = duckdb.connect(args.db)
+    print("Connected to DuckDB:", args.db)
+
+    t0 = time.perf_counter()
+    # read on one cursor, write on another so the stream stays valid while inserting
+    reader = fetch_batches(SCORING_SQL, batch_size=args.chunk_size, con=con.cursor(), tag="score_delays")
+    n = score_to_table(con.cursor(), model, reader, table=args.table)
+    secs = time.perf_counter() - t0
+    print(f"Scored {n} rows into {args.table} in {secs:.2f}s ({n / secs if secs else 0:,.0f} rows/s)")
+
+    con.close()
+
+if __name__ == "__main__":
+    main()
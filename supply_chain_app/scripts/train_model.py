@@ -5,27 +5,163 @@ if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
 # train_model.py
+import argparse
+import itertools
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+from contextlib import contextmanager
 import duckdb
-from utils.ml import prepare_training_df_from_duckdb, train_model_from_df
+from utils.ml import prepare_training_df_from_duckdb, training_matrix, fit_model, FEATURES
+from utils.query_cache import warehouse_version
+from utils.duckdb_conn import current_snapshot
+from utils import model_registry
 import os
 
-DB_PATH = r"T:/supply-chain-lakehouse/warehouse/supply_chain.duckdb"
+# published snapshot when running in blue/green mode (SUPPLY_CHAIN_SNAPSHOT_DIR)
+DB_PATH = current_snapshot() or os.environ.get("SUPPLY_CHAIN_DB", r"T:/supply-chain-lakehouse/warehouse/supply_chain.duckdb")
+
+# small grid for --sweep; every combination is one task on the process pool
+SWEEP_GRID = {
+    "n_estimators": [100, 200],
+    "max_depth": [None, 8, 16],
+    "min_samples_leaf": [1, 5],
+}
+
+class StageTimer:
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name):
+        t0 = time.perf_counter()
+        yield
+        self.timings[name] = round(time.perf_counter() - t0, 4)
+        print(f"[{name}] {self.timings[name]:.2f}s")
+
+def _evaluate(params, X_train, y_train, X_val, y_val):
+    from sklearn.metrics import accuracy_score, roc_auc_score
+    t0 = time.perf_counter()
+    model = fit_model(X_train, y_train, n_jobs=1, **params)
+    if len(set(y_val)) > 1:
+        score = roc_auc_score(y_val, model.predict_proba(X_val)[:, 1])
+    else:
+        score = accuracy_score(y_val, model.predict(X_val))
+    return params, float(score), time.perf_counter() - t0
+
+def sweep(X, y, workers, budget, seed=42):
+    """Evaluate SWEEP_GRID on a holdout split across a process pool, within `budget` seconds.
+
+    Combinations still queued when the budget runs out are cancelled (fits already running
+    finish in the background and are ignored). Returns the best params, or None.
+    """
+    from sklearn.model_selection import train_test_split
+    X, y = X.to_numpy(dtype=float), y.to_numpy()
+    X_tr, X_val, y_tr, y_val = train_test_split(
+        X, y, test_size=0.25, random_state=seed, stratify=y if len(set(y)) > 1 else None)
+
+    keys = list(SWEEP_GRID)
+    combos = [dict(zip(keys, values)) for values in itertools.product(*SWEEP_GRID.values())]
+    results = []
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = [pool.submit(_evaluate, p, X_tr, y_tr, X_val, y_val) for p in combos]
+        for fut in as_completed(futures, timeout=budget):
+            params, score, secs = fut.result()
+            results.append((score, params))
+            print(f"  sweep {params} -> {score:.4f} ({secs:.2f}s)")
+    except FuturesTimeout:
+        print(f"  sweep time budget ({budget:.0f}s) reached after {len(results)}/{len(combos)} combinations")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    if not results:
+        return None
+    score, params = max(results, key=lambda r: r[0])
+    print(f"Best params: {params} (score {score:.4f})")
+    return params
 
 def main():
-    if not os.path.exists(DB_PATH):
-        raise SystemExit(f"DuckDB file not found at {DB_PATH}")
+    ap = argparse.ArgumentParser(description="Train and register the delay predictor.")
+    ap.add_argument("--db", default=DB_PATH)
+    ap.add_argument("--n-jobs", type=int, default=-1, help="cores for fitting (-1 = all)")
+    ap.add_argument("--sample-rows", type=int, default=None, help="sample this many rows inside DuckDB")
+    ap.add_argument("--stratify", action="store_true", help="keep delay_flag class shares when sampling")
+    ap.add_argument("--warm-start", type=int, default=None, metavar="N_TREES",
+                    help="grow the latest registered forest by N_TREES fitted on facts loaded since it was trained")
+    ap.add_argument("--sweep", action="store_true", help="run a small hyperparameter sweep before the final fit")
+    ap.add_argument("--sweep-workers", type=int, default=os.cpu_count())
+    ap.add_argument("--time-budget", type=float, default=300.0, help="seconds allowed for --sweep")
+    ap.add_argument("--batch-size", type=int, default=100_000, help="rows per record batch fetched from DuckDB")
+    ap.add_argument("--memory-limit", default=None, help="DuckDB memory_limit, e.g. 2GB; larger joins spill to disk")
+    ap.add_argument("--temp-directory", default=None, help="where DuckDB spills when over --memory-limit")
+    args = ap.parse_args()
+
+    if not os.path.exists(args.db):
+        raise SystemExit(f"DuckDB file not found at {args.db}")
+
+    timer = StageTimer()
+    config = {"preserve_insertion_order": False}
+    if args.memory_limit:
+        config["memory_limit"] = args.memory_limit
+    if args.temp_directory:
+        config["temp_directory"] = args.temp_directory
+    con = duckdb.connect(args.db, read_only=True, config=config)
+    print("Connected to DuckDB:", args.db)
+
+    base_model, since, params = None, None, {}
+    if args.warm_start:
+        meta = model_registry.load_metadata()
+        if meta is None:
+            raise SystemExit("--warm-start needs a registered model; train one first.")
+        base_model = model_registry.load_artifact(meta["version"], mmap=False)
+        since = meta.get("max_loaded_at")
+        if since is None:
+            # without the watermark the "new batch" would be the whole history
+            raise SystemExit(f"{meta['version']} was saved without max_loaded_at; "
+                             "retrain without --warm-start.")
+        params = meta.get("params") or {}
+        print(f"Warm start from {meta['version']} ({len(base_model.estimators_)} trees), facts loaded after {since}")
 
-    con = duckdb.connect(DB_PATH)
-    print("Connected to DuckDB:", DB_PATH)
+    watermark = con.execute("SELECT max(loaded_at) FROM fact_sales").fetchone()[0]
 
-    print("Preparing training dataframe (joining fact_sales -> stg_supply_chain)...")
-    df = prepare_training_df_from_duckdb(con)
+    with timer.stage("query"):
+        try:
+            df = prepare_training_df_from_duckdb(con, batch_size=args.batch_size, sample_rows=args.sample_rows,
+                                                 stratify=args.stratify, since=since)
+        except ValueError:
+            if base_model is None:
+                raise
+            print("No new facts since the registered model; nothing to do.")
+            return
     print("Training dataframe shape:", df.shape)
     print("Label distribution:\n", df["delay_flag"].value_counts().to_dict())
 
-    print("Training model...")
-    model = train_model_from_df(df, save=True)
-    print("Model trained and saved to models/delay_predictor.pkl")
+    with timer.stage("feature_build"):
+        X, y = training_matrix(df)
+
+    if args.sweep and base_model is None:
+        with timer.stage("sweep"):
+            params = sweep(X, y, args.sweep_workers, args.time_budget) or {}
+
+    with timer.stage("fit"):
+        if base_model is not None:
+            if y.nunique() < len(base_model.classes_):
+                raise SystemExit("New batch does not contain every class; retrain from scratch instead.")
+            model = fit_model(X, y, n_estimators=args.warm_start, n_jobs=args.n_jobs, base_model=base_model)
+        else:
+            model = fit_model(X, y, n_jobs=args.n_jobs, **params)
+
+    with timer.stage("serialize"):
+        version = model_registry.save_model(
+            model, FEATURES, training_rows=len(df), data_version=warehouse_version(con, args.db),
+            max_loaded_at=watermark,
+            extra={
+                "params": params,
+                "warm_start_from": since is not None,
+                "timings": timer.timings,
+            })
+    print(f"Model trained and registered: {version} ({len(model.estimators_)} trees)")
+    print("Stage timings:", timer.timings)
 
     con.close()
 
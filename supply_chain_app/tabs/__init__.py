@@ -0,0 +1,101 @@
+"""Streamlit tabs, one module per tab, imported the first time the tab is selected.
+
+Streamlit re-executes app.py on every interaction, so app.py itself only imports this
+package; plotly, sklearn and google.generativeai are paid for by the tab that needs them.
+After the first render a background thread warms the rest of the process (see warm_up).
+"""
+import collections
+import datetime
+import importlib
+import os
+import sys
+import threading
+import time
+
+TABS = {
+    "Dashboard": "tabs.dashboard",
+    "ML Prediction": "tabs.ml_prediction",
+    "LLM Insight": "tabs.llm_insight",
+    "Query Explorer": "tabs.query_explorer",
+    "Pipeline Checker": "tabs.pipeline_checker",
+    "Performance": "tabs.performance",
+}
+
+WARMUP = os.environ.get("SUPPLY_CHAIN_WARMUP", "1") != "0"
+
+_renders = collections.deque(maxlen=200)
+_warmup_lock = threading.Lock()
+_warmup_thread = None
+_warmup = {}
+
+
+def render(name, started=None):
+    """Import and run the tab's render(); time the import, the render and the whole rerun.
+
+    `started` is the perf_counter() value at the top of app.py, so `rerun_ms` covers the
+    script from its first line to the end of the tab.
+    """
+    module_name = TABS[name]
+    cold = module_name not in sys.modules
+    t0 = time.perf_counter()
+    module = importlib.import_module(module_name)
+    t1 = time.perf_counter()
+    try:
+        module.render()
+    finally:
+        # st.stop() ends a tab early by raising; the timing and the warm-up still happen
+        t2 = time.perf_counter()
+        _renders.append({
+            "tab": name,
+            "cold": cold,
+            "import_ms": round((t1 - t0) * 1000, 1),
+            "render_ms": round((t2 - t1) * 1000, 1),
+            "rerun_ms": round((t2 - (started or t0)) * 1000, 1),
+            "at": datetime.datetime.utcnow(),
+        })
+        if WARMUP:
+            start_warm_up()
+
+
+def render_log():
+    """Recorded tab renders, newest first."""
+    return list(reversed(_renders))
+
+
+def warm_up_log():
+    """{step: milliseconds or "failed: ..."} for the warm-up steps that have finished."""
+    return dict(_warmup)
+
+
+def warm_up():
+    """Import the heavy tab modules, load the model and prefetch the Dashboard queries.
+
+    Every step is best effort: a missing model or warehouse only means that tab pays on
+    first use, as it would without warm-up.
+    """
+    def step(name, fn):
+        t0 = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            _warmup[name] = f"failed: {e}"
+            return
+        _warmup[name] = round((time.perf_counter() - t0) * 1000, 1)
+
+    from utils.duckdb_conn import query_tag
+
+    step("import dashboard", lambda: importlib.import_module("tabs.dashboard"))
+    step("import ml_prediction", lambda: importlib.import_module("tabs.ml_prediction"))
+    step("load model", lambda: sys.modules["tabs.ml_prediction"].load_model())
+    with query_tag("warmup:dashboard"):
+        step("prefetch dashboard", lambda: sys.modules["tabs.dashboard"].prefetch())
+
+
+def start_warm_up():
+    """Start warm_up() on a daemon thread, once per process."""
+    global _warmup_thread
+    with _warmup_lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(target=warm_up, name="supply-chain-warmup", daemon=True)
+            _warmup_thread.start()
+    return _warmup_thread
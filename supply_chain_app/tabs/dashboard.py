@@ -0,0 +1,166 @@
+import plotly.express as px
+import streamlit as st
+
+from utils import chart_data as cd
+from utils import dashboard_queries as dq
+from utils.charts import histogram_figure, treemap_figure, scatter_figure
+from utils.query_cache import cache_stats
+
+
+def _default_filters(all_cats, all_modes):
+    return all_cats[:2], all_modes
+
+
+def prefetch():
+    """Run the panel queries for the default filters so the first Dashboard view hits the cache."""
+    all_cats, all_modes = dq.filter_options()
+    if not all_cats:
+        return
+    cats, modes = _default_filters(all_cats, all_modes)
+    dq.metrics(cats, modes)
+    cd.revenue_treemap(cats, modes)
+    dq.top_suppliers(cats, modes, n=10)
+    cd.cost_vs_lead_time(cats, modes)
+    dq.carrier_performance(cats, modes)
+    dq.stockout_risk(cats, modes, n=10)
+    cd.defect_histogram(cats, modes, bins=20)
+    cd.defect_box(cats, modes)
+
+
+def render():
+    st.title("🚀 Supply Chain Command Center")
+    st.markdown("### Monitor Performance, Logistics, and Inventory Risks")
+
+    # 1. DATA LOADING
+    # Filter dan agregasi dihitung di DuckDB (utils.dashboard_queries); yang masuk ke
+    # Python hanya hasil seukuran chart.
+    try:
+        all_cats, all_modes = dq.filter_options()
+    except Exception as e:
+        st.error(f"❌ Database Error: {e}")
+        st.stop()
+
+    if not all_cats:
+        st.warning("No data available.")
+        st.stop()
+
+    # 2. SIDEBAR FILTERS (Interactive)
+    with st.sidebar:
+        st.header("🔍 Filters")
+        
+        # Filter Category
+        default_cats, default_modes = _default_filters(all_cats, all_modes)
+        sel_cats = st.multiselect("Product Category", all_cats, default=default_cats)
+        
+        # Filter Transport Mode
+        sel_modes = st.multiselect("Transport Mode", all_modes, default=default_modes)
+
+    # 3. TOP LEVEL METRICS
+    st.markdown("---")
+    col1, col2, col3, col4 = st.columns(4)
+
+    m = dq.metrics(sel_cats, sel_modes)
+    total_rev = m['total_revenue']
+    avg_defect = m['avg_defect_rate']
+    avg_ship_cost = m['avg_shipping_cost']
+    avg_lead = m['avg_lead_time']
+
+    col1.metric("💰 Total Revenue", f"Rp {total_rev:,.0f}", help="Total revenue from selected segments")
+    col2.metric("⚠️ Avg Defect Rate", f"{avg_defect:.2f}%", delta_color="inverse", delta=f"{avg_defect-2:.2f}% (vs Target)")
+    col3.metric("🚚 Avg Shipping Cost", f"${avg_ship_cost:.2f}", delta_color="inverse")
+    col4.metric("⏱️ Avg Lead Time", f"{avg_lead:.1f} Days")
+
+    st.markdown("---")
+
+    # 4. DASHBOARD TABS
+    tab_overview, tab_logistics, tab_inventory = st.tabs(["📊 Overview & Sales", "🚢 Logistics & Cost", "📦 Inventory & Risk"])
+
+    # --- TAB 1: OVERVIEW ---
+    with tab_overview:
+        c1, c2 = st.columns([2, 1])
+        
+        with c1:
+            st.subheader("Revenue by Product Category")
+            # Treemap sangat bagus untuk melihat proporsi kategori -> supplier
+            # total tiap level dihitung di DuckDB; Plotly hanya menerima node treemap
+            fig_tree = treemap_figure(cd.revenue_treemap(sel_cats, sel_modes),
+                                      title="Revenue Breakdown (Color = Defect Rate Risk)")
+            st.plotly_chart(fig_tree, use_container_width=True)
+            
+        with c2:
+            st.subheader("Top Suppliers by Revenue")
+            top_sup = dq.top_suppliers(sel_cats, sel_modes, n=10)
+            fig_bar = px.bar(top_sup, x='total_revenue', y='supplier_name', orientation='h', color='total_revenue', title="Leaderboard")
+            fig_bar.update_layout(yaxis={'categoryorder':'total ascending'}, showlegend=False)
+            st.plotly_chart(fig_bar, use_container_width=True)
+
+    # --- TAB 2: LOGISTICS ---
+    with tab_logistics:
+        st.subheader("Shipping Efficiency Analysis")
+        st.caption("Insight: Identify carriers that are expensive AND slow (Top Left Quadrant is bad).")
+        
+        c_log1, c_log2 = st.columns([2, 1])
+        
+        with c_log1:
+            # Scatter Plot: Cost vs Time (The most important logic metric)
+            points, total_points = cd.cost_vs_lead_time(sel_cats, sel_modes)
+            fig_scatter = scatter_figure(points,
+                                         x="lead_time", 
+                                         y="shipping_cost", 
+                                         size="total_sold", 
+                                         color="transport_mode",
+                                         hover_data=['shipping_carrier', 'product_category'],
+                                         title="Correlation: Shipping Cost vs. Lead Time",
+                                         labels={"lead_time": "Delivery Time (Days)", "shipping_cost": "Cost per Unit"})
+            # Add average lines
+            fig_scatter.add_vline(x=avg_lead, line_dash="dash", line_color="gray")
+            fig_scatter.add_hline(y=avg_ship_cost, line_dash="dash", line_color="gray")
+            st.plotly_chart(fig_scatter, use_container_width=True)
+            if total_points > len(points):
+                st.caption(f"Showing a sample of {len(points):,} of {total_points:,} products")
+            
+        with c_log2:
+            st.markdown("#### Carrier Performance")
+            # Compare Carrier Costs
+            carrier_perf = dq.carrier_performance(sel_cats, sel_modes)
+            fig_carrier = px.bar(carrier_perf, x='shipping_carrier', y='shipping_cost', 
+                                 color='lead_time', title="Avg Cost by Carrier",
+                                 labels={'lead_time': 'Avg Days'})
+            st.plotly_chart(fig_carrier, use_container_width=True)
+
+    # --- TAB 3: INVENTORY & RISK ---
+    with tab_inventory:
+        c_inv1, c_inv2 = st.columns(2)
+        
+        with c_inv1:
+            st.subheader("🚨 Stockout Risk Monitor")
+            st.caption("Products with High Sales Velocity but Low Stock.")
+            
+            # Logic: Ratio Sold vs Stock (dihitung di SQL)
+            risk_df = dq.stockout_risk(sel_cats, sel_modes, n=10)
+            
+            st.dataframe(
+                risk_df[['product_id', 'product_category', 'stock_level', 'total_sold', 'turnover_risk']],
+                column_config={
+                    "turnover_risk": st.column_config.ProgressColumn("Risk Score", format="%.1f", min_value=0, max_value=risk_df['turnover_risk'].max())
+                },
+                use_container_width=True
+            )
+            
+        with c_inv2:
+            st.subheader("Quality Control: Defect Analysis")
+            # Histogram defect rate
+            # bin histogram dan statistik box dihitung di DuckDB
+            fig_hist = histogram_figure(cd.defect_histogram(sel_cats, sel_modes, bins=20),
+                                        title="Distribution of Defect Rates", x_title="defect_rate",
+                                        box=cd.defect_box(sel_cats, sel_modes))
+            st.plotly_chart(fig_hist, use_container_width=True)
+
+    # Data Source Checkbox
+    with st.expander("Show Raw Aggregated Data"):
+        st.caption(f"Top {dq.RAW_LIMIT:,} rows by revenue")
+        st.dataframe(dq.detail_rows(sel_cats, sel_modes))
+
+    stats = cache_stats()
+    st.caption(f"Query cache: {stats['hits']} hits / {stats['misses']} misses "
+               f"({stats['hit_rate']:.0%}), {stats['entries']} entries, {stats['bytes'] / 1e6:.1f} MB")
@@ -0,0 +1,21 @@
+import streamlit as st
+
+from utils.duckdb_conn import load_table, query_tag
+from utils.llm import supply_chain_insight
+
+
+def render():
+    st.header("🧠 AI Supply Chain Analyst")
+
+    api_key = st.session_state.get("gemini_api_key")
+    if not api_key:
+        st.info("Insert Gemini API key first")
+    else:
+        with query_tag("llm:mart"):
+            df = load_table("mart_supply_chain_performance")
+
+        query = st.text_area("Ask anything about your supply chain:")
+        if st.button("Ask Gemini"):
+            with st.spinner("Analyzing..."):
+                ans = supply_chain_insight(df, query, api_key)
+                st.write(ans)
@@ -0,0 +1,31 @@
+import streamlit as st
+
+from utils.duckdb_conn import load_table, query_tag
+from utils.ml import load_model, predict_delay
+from utils.model_registry import get_metadata
+
+
+def render():
+    st.header("🤖 Supplier Delay Prediction")
+
+    with query_tag("ml:fact_sales"):
+        df = load_table("fact_sales")
+
+    # Training never runs here: the model comes from the registry (cached per process)
+    try:
+        model = load_model()
+    except FileNotFoundError:
+        st.warning("No trained model yet. Run `python scripts/train_model.py` to register one.")
+        st.stop()
+    meta = get_metadata()
+    if meta:
+        st.success(f"Model {meta['version']} loaded ({meta['training_rows']:,} training rows, trained {meta['created_at']}).")
+    else:
+        st.success("Model loaded (legacy pickle).")
+
+    # Input row selector
+    row = df.sample(1).iloc[0]
+    st.write("Selected Data Point:", row)
+
+    prob = predict_delay(model, row)
+    st.metric("Delay Probability", f"{prob*100:.2f}%")
@@ -0,0 +1,38 @@
+import pandas as pd
+import streamlit as st
+
+import tabs
+from utils.duckdb_conn import query_summary, query_log, to_pandas
+
+
+def render():
+    st.header("⏱️ Query Performance")
+    st.caption("Latency per query tag from this process's query log "
+               "(SUPPLY_CHAIN_METRICS_DB keeps a persistent copy).")
+
+    persisted = st.checkbox("Use persisted metrics table", value=False)
+    summary = query_summary(persisted=persisted)
+    if summary is None:
+        st.info("No queries recorded yet." if not persisted else "SUPPLY_CHAIN_METRICS_DB is not set.")
+    else:
+        st.dataframe(to_pandas(summary), use_container_width=True)
+
+    # query paling lambat di log, termasuk profil JSON DuckDB kalau tertangkap (SUPPLY_CHAIN_PROFILE_MS)
+    slow = sorted(query_log(), key=lambda r: r["seconds"], reverse=True)[:20]
+    if slow:
+        st.subheader("Slowest Recent Queries")
+        st.dataframe(pd.DataFrame(slow).drop(columns=["profile"]), use_container_width=True)
+        for rec in slow:
+            if rec["profile"]:
+                with st.expander(f"Profile: {rec['tag']} ({rec['seconds'] * 1000:.0f} ms)"):
+                    st.json(rec["profile"])
+
+    # waktu render per tab: import modul tab (cold = pertama kali di proses ini) + render
+    renders = tabs.render_log()
+    if renders:
+        st.subheader("Tab Render Times")
+        st.dataframe(pd.DataFrame(renders), use_container_width=True)
+    warm = tabs.warm_up_log()
+    if warm:
+        with st.expander("Warm-up (ms)"):
+            st.json(warm)
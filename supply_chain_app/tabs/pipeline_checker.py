@@ -0,0 +1,29 @@
+import pandas as pd
+import streamlit as st
+
+from utils.checker import BRONZE, check_pipeline
+
+
+def render():
+    st.header("🧪 Pipeline Health Check")
+
+    # hasil di-cache singkat (SUPPLY_CHAIN_CHECK_TTL), tombol Refresh memaksa cek ulang
+    checks = check_pipeline(force=st.button("🔄 Refresh"))
+    fresh = checks["freshness"]
+    if checks["missing"]:
+        st.warning("Not found: " + ", ".join(f"`{p}`" for p in checks["missing"]))
+    bronze_missing = str(BRONZE) in checks["missing"]
+
+    c1, c2, c3 = st.columns(3)
+    lag = fresh["lag_seconds"]
+    c1.metric("Freshness Lag", "not found" if lag is None else f"{lag / 60:.1f} min",
+              help="Latest bronze file vs last fact_sales build")
+    c2.metric("Pending Bronze Files", "not found" if bronze_missing else fresh["bronze_pending_files"],
+              help=str(BRONZE))
+    c3.metric("Latest Bronze File", fresh["latest_bronze_file"] or "not found", help=str(BRONZE))
+
+    st.dataframe(pd.DataFrame(checks["tables"]), use_container_width=True)
+    with st.expander("Freshness details"):
+        st.json({k: "not found" if v is None else str(v) for k, v in fresh.items()})
+    st.caption(f"Checked at {checks['checked_at']:%Y-%m-%d %H:%M:%S} UTC "
+               f"in {checks['check_seconds'] * 1000:.0f} ms")
@@ -0,0 +1,60 @@
+import streamlit as st
+
+from utils import explorer
+from utils.duckdb_conn import to_pandas
+
+
+def render():
+    st.header("💻 SQL Query Explorer (DuckDB)")
+
+    query = st.text_area("SQL Query", "SELECT * FROM fact_sales LIMIT 10")
+
+    with st.expander("Limits"):
+        l1, l2, l3, l4 = st.columns(4)
+        page_size = l1.number_input("Page size", 10, 10_000, explorer.DEFAULT_PAGE_SIZE, step=100)
+        max_rows = l2.number_input("Row cap", 100, 10_000_000, explorer.DEFAULT_MAX_ROWS, step=10_000)
+        max_mb = l3.number_input("Byte cap (MB)", 1, 4096, explorer.DEFAULT_MAX_BYTES // (1024 * 1024))
+        timeout = l4.number_input("Timeout (s)", 1, 3600, int(explorer.DEFAULT_TIMEOUT))
+
+    b1, b2, b3, b4 = st.columns(4)
+    run = b1.button("Run")
+    more = b2.button("Next page")
+    cancel = b3.button("Cancel")
+    prof = b4.button("Profile")
+
+    state = st.session_state
+    pq = state.get("explorer_query")
+
+    if cancel and pq is not None:
+        pq.cancel()
+
+    try:
+        if run:
+            if pq is not None:
+                pq.close()
+            pq = explorer.PagedQuery(query, page_size=int(page_size), max_rows=int(max_rows),
+                                     max_bytes=int(max_mb) * 1024 * 1024, timeout=float(timeout)).start()
+            state.explorer_query = pq
+            state.explorer_pages = []
+        if (run or more) and pq is not None:
+            page = pq.next_page()
+            if page is not None:
+                state.explorer_pages.append(page)
+    except Exception as e:
+        st.error(f"❌ Query Error: {e}")
+
+    pages = state.get("explorer_pages", [])
+    if pq is not None and pages:
+        idx = st.number_input("Page", 1, len(pages), len(pages)) - 1
+        st.dataframe(to_pandas(pages[idx]))
+        status = pq.reason or f"more rows available — click Next page within {pq.idle_timeout:.0f}s"
+        st.caption(f"{pq.rows:,} rows / {pq.bytes / 1e6:.2f} MB fetched in {pq.elapsed:.2f}s · {status}")
+    elif pq is not None and pq.reason:
+        st.warning(f"Query {pq.reason}.")
+
+    if prof:
+        try:
+            with st.spinner("Running EXPLAIN ANALYZE..."):
+                st.code(explorer.profile(query, timeout=float(timeout)), language=None)
+        except Exception as e:
+            st.error(f"❌ Profile Error: {e}")
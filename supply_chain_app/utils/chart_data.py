@@ -0,0 +1,138 @@
+import duckdb
+
+from utils import dashboard_queries as dq
+from utils.duckdb_conn import tagged, to_pandas
+from utils.query_cache import cached_query
+
+# scatter plots above this many points are sampled in DuckDB; above WEBGL_THRESHOLD the
+# figure switches to WebGL traces
+SCATTER_LIMIT = 5000
+WEBGL_THRESHOLD = 1000
+
+
+# -- SQL builders: `source` is any relation exposing `column` (and `group` if given) -----
+
+def histogram_sql(source, column, bins, group=None):
+    """Equal-width bins over [min, max] of `column`: grp, bin, bin_start, bin_end, count."""
+    grp = group or "NULL"
+    return f"""
+    WITH src AS (
+        SELECT {grp} AS grp, CAST({column} AS DOUBLE) AS x FROM {source} WHERE {column} IS NOT NULL
+    ),
+    bounds AS (
+        SELECT min(x) AS lo, CASE WHEN max(x) > min(x) THEN (max(x) - min(x)) / {int(bins)} ELSE 1 END AS w
+        FROM src
+    ),
+    binned AS (
+        SELECT grp, least({int(bins) - 1}, CAST(floor((x - lo) / w) AS INTEGER)) AS bin, lo, w
+        FROM src, bounds
+    )
+    SELECT grp, bin, lo + bin * w AS bin_start, lo + (bin + 1) * w AS bin_end, count(*) AS count
+    FROM binned
+    GROUP BY grp, bin, lo, w
+    ORDER BY grp, bin
+    """
+
+
+def box_sql(source, column, group=None):
+    """Tukey box statistics per group: q1, median, q3, mean, n and the 1.5 IQR whisker ends."""
+    grp = group or "NULL"
+    return f"""
+    WITH src AS (
+        SELECT {grp} AS grp, CAST({column} AS DOUBLE) AS x FROM {source} WHERE {column} IS NOT NULL
+    ),
+    q AS (
+        SELECT grp, quantile_cont(x, 0.25) AS q1, median(x) AS median, quantile_cont(x, 0.75) AS q3,
+               avg(x) AS mean, count(*) AS n
+        FROM src GROUP BY grp
+    )
+    SELECT
+        q.grp, q.q1, q.median, q.q3, q.mean, q.n,
+        min(s.x) FILTER (WHERE s.x >= q.q1 - 1.5 * (q.q3 - q.q1)) AS lowerfence,
+        max(s.x) FILTER (WHERE s.x <= q.q3 + 1.5 * (q.q3 - q.q1)) AS upperfence
+    FROM q JOIN src s ON s.grp IS NOT DISTINCT FROM q.grp
+    GROUP BY q.grp, q.q1, q.median, q.q3, q.mean, q.n
+    ORDER BY q.grp
+    """
+
+
+# -- executors ------------------------------------------------------------------------
+
+def _on_filtered(sql, categories=None, modes=None, params=()):
+    # the builder's own WITH runs as a subquery on top of dashboard_queries' `filtered`
+    where, base_params = dq._filters(categories, modes)
+    full = dq.BASE_CTE.format(where=where) + f"SELECT * FROM ({sql})"
+    return to_pandas(cached_query(full, base_params + list(params)))
+
+
+def on_frame(sql, df):
+    """Run a builder's SQL over a pandas DataFrame (registered as `frame`) in an in-memory DuckDB."""
+    con = duckdb.connect()
+    try:
+        con.register("frame", df)
+        return to_pandas(con.execute(sql).fetch_arrow_table())
+    finally:
+        con.close()
+
+
+def histogram_frame(df, column, bins=40, group=None):
+    return on_frame(histogram_sql("frame", column, bins, group), df)
+
+
+def box_frame(df, column, group=None):
+    return on_frame(box_sql("frame", column, group), df)
+
+
+# -- Dashboard panels -----------------------------------------------------------------
+
+@tagged("dashboard:defect_histogram")
+def defect_histogram(categories=None, modes=None, bins=20):
+    return _on_filtered(histogram_sql("filtered", "defect_rate", bins, "product_category"), categories, modes)
+
+
+@tagged("dashboard:defect_box")
+def defect_box(categories=None, modes=None):
+    return _on_filtered(box_sql("filtered", "defect_rate", "product_category"), categories, modes)
+
+
+@tagged("dashboard:revenue_treemap")
+def revenue_treemap(categories=None, modes=None):
+    """Treemap nodes (id, label, parent, value, color) with totals for every level.
+
+    Each level is one rollup lookup, so the payload is the number of category/supplier pairs
+    however many facts there are; color is the revenue-weighted defect rate of the node.
+    """
+    import pandas as pd
+
+    measures = ["total_revenue", "weighted_defect_rate"]
+    levels = [
+        ([], lambda r: ("All", "All", "")),
+        (["product_category"], lambda r: (f"All/{r.product_category}", r.product_category, "All")),
+        (["product_category", "supplier_name"],
+         lambda r: (f"All/{r.product_category}/{r.supplier_name}", r.supplier_name, f"All/{r.product_category}")),
+    ]
+    nodes = []
+    for group_by, ids in levels:
+        df = dq.aggregate(group_by, measures, categories, modes)
+        for r in df[df["total_revenue"] > 0].itertuples(index=False):
+            node_id, label, parent = ids(r)
+            nodes.append((node_id, label, parent, r.total_revenue, r.weighted_defect_rate))
+    return pd.DataFrame(nodes, columns=["id", "label", "parent", "value", "color"])
+
+
+@tagged("dashboard:cost_vs_lead_time")
+def cost_vs_lead_time(categories=None, modes=None, limit=SCATTER_LIMIT):
+    """Product points for the cost/lead-time scatter and the total number of points.
+
+    Above `limit` points a reproducible reservoir sample is taken in DuckDB, so the shape
+    of the cloud is kept while the payload stays bounded.
+    """
+    df = _on_filtered(f"""
+    SELECT lead_time, shipping_cost, CAST(total_sold AS DOUBLE) AS total_sold,
+           transport_mode, shipping_carrier, product_category,
+           (SELECT count(*) FROM filtered) AS total_points
+    FROM filtered
+    USING SAMPLE reservoir({int(limit)} ROWS) REPEATABLE (42)
+    """, categories, modes)
+    total = int(df["total_points"].iloc[0]) if len(df) else 0
+    return df.drop(columns=["total_points"]), total
@@ -1,5 +1,64 @@
 ﻿import plotly.express as px
+import plotly.graph_objects as go
 import pandas as pd
+from plotly.subplots import make_subplots
+from utils.chart_data import histogram_frame, box_frame, WEBGL_THRESHOLD
+
+# Figures here are drawn from pre-aggregated chart data (utils.chart_data): bins, box
+# statistics and treemap totals come from DuckDB, so Plotly only serializes those.
+
+def _groups(df):
+    return df["grp"].drop_duplicates().tolist() if len(df) else []
+
+def _name(grp, default):
+    return default if grp is None or pd.isna(grp) else str(grp)
+
+def box_traces(box, name="value", horizontal=False):
+    traces = []
+    for r in box.itertuples(index=False):
+        label = _name(r.grp, name)
+        stats = dict(q1=[r.q1], median=[r.median], q3=[r.q3], mean=[r.mean],
+                     lowerfence=[r.lowerfence], upperfence=[r.upperfence], name=label,
+                     legendgroup=label, showlegend=False)
+        stats["y" if horizontal else "x"] = [label]
+        traces.append(go.Box(orientation="h" if horizontal else "v", **stats))
+    return traces
+
+def histogram_figure(hist, title, x_title, box=None):
+    """Stacked histogram from binned counts, with an optional marginal box plot on top."""
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.25, 0.75],
+                        vertical_spacing=0.03) if box is not None else go.Figure()
+    bar_pos = dict(row=2, col=1) if box is not None else {}
+    for grp in _groups(hist):
+        part = hist[hist["grp"].isna()] if pd.isna(grp) else hist[hist["grp"] == grp]
+        label = _name(grp, "count")
+        fig.add_trace(go.Bar(x=(part["bin_start"] + part["bin_end"]) / 2, y=part["count"],
+                             width=part["bin_end"] - part["bin_start"], name=label, legendgroup=label),
+                      **bar_pos)
+    if box is not None:
+        for trace in box_traces(box, horizontal=True):
+            fig.add_trace(trace, row=1, col=1)
+    fig.update_layout(barmode="stack", bargap=0, title=title)
+    fig.update_xaxes(title_text=x_title, **bar_pos)
+    return fig
+
+def treemap_figure(nodes, title, colorscale="RdYlGn_r"):
+    """Treemap from nodes carrying their own totals (id, label, parent, value, color)."""
+    fig = go.Figure(go.Treemap(
+        ids=nodes["id"], labels=nodes["label"], parents=nodes["parent"], values=nodes["value"],
+        branchvalues="total",
+        marker=dict(colors=nodes["color"], colorscale=colorscale, showscale=True),
+    ))
+    fig.update_layout(title=title, margin=dict(t=50, l=10, r=10, b=10))
+    return fig
+
+def scatter_figure(df, **kwargs):
+    """px.scatter that switches to WebGL traces once there are many points."""
+    render_mode = "webgl" if len(df) > WEBGL_THRESHOLD else "auto"
+    if not len(df):
+        # nothing to size: the max of an empty Arrow-backed column is None, not NaN
+        kwargs.pop("size", None)
+    return px.scatter(df, render_mode=render_mode, **kwargs)
 
 def supplier_defect_chart(df):
     if 'supplier_name' not in df.columns or 'defect_rate' not in df.columns:
@@ -28,12 +87,9 @@ def lead_time_chart(df):
         fig.update_layout(title="Lead Time Distribution (cannot render — missing columns)")
         return fig
 
-    return px.box(
-        df,
-        x="supplier_name",
-        y=y_col,
-        title="Supplier Lead Time Distribution"
-    )
+    fig = go.Figure(box_traces(box_frame(df, y_col, "supplier_name")))
+    fig.update_layout(title="Supplier Lead Time Distribution", xaxis_title="supplier_name", yaxis_title=y_col)
+    return fig
 
 def shipping_cost_chart(df):
     cost_col = None
@@ -47,9 +103,4 @@ def shipping_cost_chart(df):
         fig.update_layout(title="Shipping Cost Distribution (cannot render — missing columns)")
         return fig
 
-    return px.histogram(
-        df,
-        x=cost_col,
-        nbins=40,
-        title="Shipping Cost Distribution"
-    )
+    return histogram_figure(histogram_frame(df, cost_col, bins=40), "Shipping Cost Distribution", cost_col)
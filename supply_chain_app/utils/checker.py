@@ -1,23 +1,152 @@
-from utils.duckdb_conn import get_conn
+import datetime
+import json
+import os
+import pathlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-def check_pipeline():
-    con = get_conn()
+from utils.duckdb_conn import connection, fetch_arrow
 
-    checks = {}
+# repo root, so the checks do not depend on the directory streamlit was started from
+ROOT = pathlib.Path(__file__).resolve().parents[2]
+BRONZE = pathlib.Path(os.environ.get("SUPPLY_CHAIN_BRONZE", ROOT / "storage" / "bronze"))
+RUN_RESULTS = pathlib.Path(os.environ.get("DBT_TARGET_PATH", ROOT / "dbt" / "supply_chain" / "target")) / "run_results.json"
+CHECK_TTL = float(os.environ.get("SUPPLY_CHAIN_CHECK_TTL", 30))
 
-    required_tables = [
-        "raw_supply_chain",
-        "stg_supply_chain",
-        "dim_product",
-        "fact_sales",
-        "mart_supply_chain_performance",
-    ]
+REQUIRED_TABLES = [
+    "raw_supply_chain",
+    "stg_supply_chain",
+    "dim_product",
+    "dim_product_current",
+    "fact_sales",
+    "mart_supply_chain_performance",
+]
 
-    for table in required_tables:
-        try:
-            con.execute(f"SELECT 1 FROM {table} LIMIT 1")
-            checks[table] = "OK"
-        except:
-            checks[table] = "❌ MISSING"
+# every relation in one catalog pass; estimated_size is DuckDB's row estimate from storage
+# metadata, so nothing is scanned (views have none)
+CATALOG_SQL = """
+SELECT table_name AS name, 'table' AS kind, estimated_size
+FROM duckdb_tables() WHERE NOT internal AND schema_name = 'main'
+UNION ALL
+SELECT view_name, 'view', NULL
+FROM duckdb_views() WHERE NOT internal AND schema_name = 'main'
+"""
 
-    return checks
+# relation -> {alias: expression}; only relations present in the catalog are probed
+FRESHNESS_PROBES = {
+    "raw_supply_chain": {"raw_max_ingest_ts": "max(ingest_ts)"},
+    "fact_sales": {"fact_max_ingest_ts": "max(ingest_ts)", "fact_last_loaded_at": "max(loaded_at)"},
+    "bronze_load_manifest": {"bronze_last_loaded_at": "max(loaded_at)", "bronze_loaded_files": "list(file_name)"},
+}
+
+
+def _utc(ts):
+    # TIMESTAMP columns come back naive; the loaders write them in UTC
+    if ts is None:
+        return None
+    return ts if ts.tzinfo else ts.replace(tzinfo=datetime.timezone.utc)
+
+
+def _warehouse_state():
+    with connection(private=True) as cur:
+        relations = {r["name"]: (r["kind"], r["estimated_size"])
+                     for r in fetch_arrow(CATALOG_SQL, con=cur, tag="checker:catalog").to_pylist()}
+        probes = {alias: f"(SELECT {expr} FROM {table})"
+                  for table, exprs in FRESHNESS_PROBES.items() if table in relations
+                  for alias, expr in exprs.items()}
+        fresh = {}
+        if probes:
+            sql = "SELECT " + ", ".join(f"{sql} AS {alias}" for alias, sql in probes.items())
+            fresh = fetch_arrow(sql, con=cur, tag="checker:freshness").to_pylist()[0]
+        return relations, fresh
+
+
+def _bronze_files():
+    """Names of all bronze files, and the newest one with its mtime (UTC)."""
+    files = list(BRONZE.glob("supply_chain_raw__*.csv")) + list(BRONZE.glob("ingest_date=*/supply_chain_raw__*.parquet"))
+    if not files:
+        return set(), None, None
+    stats = {p: p.stat().st_mtime for p in files}
+    latest = max(stats, key=stats.get)
+    return ({p.name for p in files}, latest.name,
+            datetime.datetime.fromtimestamp(stats[latest], tz=datetime.timezone.utc))
+
+
+def _build_timings():
+    """Per-model status / duration of the last dbt invocation, from target/run_results.json."""
+    try:
+        with open(RUN_RESULTS, encoding="utf-8") as f:
+            results = json.load(f)
+    except (OSError, ValueError):
+        return {}, None
+    models = {}
+    for r in results.get("results", []):
+        name = r.get("unique_id", "").rsplit(".", 1)[-1]
+        models[name] = {"build_status": r.get("status"), "build_seconds": r.get("execution_time")}
+    return models, results.get("metadata", {}).get("generated_at")
+
+
+def run_checks():
+    """Row counts, build timings and freshness for the warehouse, without scanning tables.
+
+    Catalog/freshness probes, the bronze directory listing and run_results.json are read
+    concurrently.
+    """
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        state = pool.submit(_warehouse_state)
+        bronze = pool.submit(_bronze_files)
+        builds = pool.submit(_build_timings)
+        relations, fresh = state.result()
+        bronze_names, bronze_file, bronze_mtime = bronze.result()
+        build_models, built_at = builds.result()
+
+    tables = []
+    for name in REQUIRED_TABLES + sorted(set(relations) - set(REQUIRED_TABLES)):
+        kind, size = relations.get(name, (None, None))
+        tables.append({
+            "table": name,
+            "status": "OK" if kind else "❌ MISSING",
+            "kind": kind,
+            "estimated_rows": size,
+            **build_models.get(name, {"build_status": None, "build_seconds": None}),
+        })
+
+    last_build = _utc(fresh.get("fact_last_loaded_at"))
+    lag = None
+    if bronze_mtime is not None and last_build is not None:
+        lag = max(0.0, (bronze_mtime - last_build).total_seconds())
+    freshness = {
+        "latest_bronze_file": bronze_file,
+        "latest_bronze_mtime": bronze_mtime,
+        "bronze_pending_files": len(bronze_names - set(fresh.get("bronze_loaded_files") or [])),
+        "bronze_last_loaded_at": _utc(fresh.get("bronze_last_loaded_at")),
+        "raw_max_ingest_ts": _utc(fresh.get("raw_max_ingest_ts")),
+        "fact_max_ingest_ts": _utc(fresh.get("fact_max_ingest_ts")),
+        "fact_last_loaded_at": last_build,
+        "lag_seconds": lag,
+        "dbt_run_at": built_at,
+    }
+    return {
+        "tables": tables,
+        "freshness": freshness,
+        "missing": [str(p) for p in (BRONZE, RUN_RESULTS) if not p.exists()],
+        "checked_at": datetime.datetime.now(datetime.timezone.utc),
+        "check_seconds": time.perf_counter() - started,
+    }
+
+
+_lock = threading.Lock()
+_last = (0.0, None)
+
+
+def check_pipeline(ttl=CHECK_TTL, force=False):
+    """run_checks(), reused for `ttl` seconds so reruns of the checker tab are instant."""
+    global _last
+    with _lock:
+        stamp, result = _last
+        if force or result is None or time.monotonic() - stamp >= ttl:
+            result = run_checks()
+            _last = (time.monotonic(), result)
+        return result
@@ -0,0 +1,193 @@
+from utils.duckdb_conn import tagged, to_pandas
+from utils.query_cache import cached_query
+
+# Mart (aggregates) joined with the current-state dimension (one row per product, so the
+# join stays the size of the mart however many ingests accumulate); every panel query
+# filters and aggregates on top of this so only chart-sized results leave DuckDB.
+BASE_CTE = """
+WITH data AS (
+    SELECT
+        m.product_id,
+        s.product_category,
+        s.supplier_name,
+        s.supplier_city,
+        s.transport_mode,
+        s.shipping_carrier,
+        s.route,
+        COALESCE(m.total_revenue, 0) as total_revenue,
+        COALESCE(m.total_sold, 0) as total_sold,
+        COALESCE(m.avg_defect_rate, s.defect_rate, 0) as defect_rate,
+        COALESCE(s.stock_level, 0) as stock_level,
+        COALESCE(s.shipping_cost, 0) as shipping_cost,
+        COALESCE(s.shipping_time_days, s.supplier_lead_time_days, 0) as lead_time,
+        COALESCE(m.avg_mfg_lead_time, 0) as mfg_lead_time
+    FROM mart_supply_chain_performance m
+    LEFT JOIN dim_product_current s ON m.product_id = s.product_id
+),
+filtered AS (
+    SELECT * FROM data
+    WHERE total_revenue > 0 {where}
+)
+"""
+
+# Fact-level slice data (one row per product per ingest) -- the detail that
+# mart_dashboard_rollup pre-aggregates.
+FACT_CTE = """
+WITH facts AS (
+    SELECT
+        product_category,
+        supplier_name,
+        transport_mode,
+        shipping_carrier,
+        route,
+        revenue,
+        quantity_sold,
+        defect_rate,
+        shipping_cost,
+        COALESCE(shipping_time_days, supplier_lead_time_days) as lead_time
+    FROM fact_sales
+)
+"""
+
+ROLLUP_TABLE = "mart_dashboard_rollup"
+ROLLUP_DIMS = ["product_category", "supplier_name", "transport_mode", "shipping_carrier"]
+
+# measure -> (expression over rollup components, same expression over fact rows)
+MEASURES = {
+    "fact_count": ("sum(fact_count)", "count(*)"),
+    "total_revenue": ("sum(revenue_sum)", "sum(revenue)"),
+    "total_sold": ("sum(sold_sum)", "sum(quantity_sold)"),
+    "avg_defect_rate": ("sum(defect_rate_sum) / nullif(sum(defect_rate_count), 0)", "avg(defect_rate)"),
+    "weighted_defect_rate": ("sum(defect_x_revenue_sum) / nullif(sum(revenue_sum), 0)",
+                             "sum(defect_rate * revenue) / nullif(sum(revenue), 0)"),
+    "avg_shipping_cost": ("sum(shipping_cost_sum) / nullif(sum(shipping_cost_count), 0)", "avg(shipping_cost)"),
+    "avg_lead_time": ("sum(lead_time_sum) / nullif(sum(lead_time_count), 0)", "avg(lead_time)"),
+}
+
+# row cap for the raw detail table
+RAW_LIMIT = 1000
+
+
+def _filters(categories=None, modes=None):
+    """Turn the sidebar multiselects into a parameterized predicate (empty selection = no filter)."""
+    clauses, params = [], []
+    for col, values in (("product_category", categories), ("transport_mode", modes)):
+        if values:
+            clauses.append(f"{col} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+    where = "".join(f" AND {c}" for c in clauses)
+    return where, params
+
+
+def _grouping_id(dims):
+    # DuckDB grouping(): bit set = dimension rolled up, first dimension is the high bit
+    n = len(ROLLUP_DIMS)
+    return sum(1 << (n - 1 - i) for i, d in enumerate(ROLLUP_DIMS) if d not in dims)
+
+
+def rollup_available():
+    try:
+        return cached_query(
+            "SELECT count(*) FROM duckdb_tables() WHERE table_name = ?", [ROLLUP_TABLE]
+        ).column(0)[0].as_py() > 0
+    except Exception:
+        return False
+
+
+def aggregate(group_by, measures, categories=None, modes=None, order_by=None, limit=None):
+    """Slice aggregate, answered from mart_dashboard_rollup when it covers the request.
+
+    The rollup covers any grouping and filtering over ROLLUP_DIMS; anything else (or a
+    warehouse where the rollup has not been built yet) is computed from the fact-level
+    detail with the same measure definitions.
+    """
+    where, params = _filters(categories, modes)
+    needed = set(group_by) | {d for d, v in (("product_category", categories), ("transport_mode", modes)) if v}
+    use_rollup = needed <= set(ROLLUP_DIMS) and rollup_available()
+
+    select = list(group_by) + [f"{MEASURES[m][0 if use_rollup else 1]} AS {m}" for m in measures]
+    if use_rollup:
+        sql = f"SELECT {', '.join(select)} FROM {ROLLUP_TABLE} WHERE grouping_id = ?{where}"
+        params = [_grouping_id(needed)] + params
+    else:
+        sql = FACT_CTE + f"SELECT {', '.join(select)} FROM facts WHERE true{where}"
+    if group_by:
+        sql += f" GROUP BY {', '.join(group_by)}"
+    if order_by:
+        sql += f" ORDER BY {order_by}"
+    if limit:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return to_pandas(cached_query(sql, params))
+
+
+def _run(select_sql, categories=None, modes=None, extra_params=()):
+    where, params = _filters(categories, modes)
+    sql = BASE_CTE.format(where=where) + select_sql
+    return to_pandas(cached_query(sql, params + list(extra_params)))
+
+
+@tagged("dashboard:filter_options")
+def filter_options():
+    sql = BASE_CTE.format(where="") + """
+    SELECT 'product_category' AS dim, product_category AS value, sum(total_revenue) AS rev
+    FROM filtered GROUP BY 1, 2
+    UNION ALL
+    SELECT 'transport_mode', transport_mode, sum(total_revenue)
+    FROM filtered GROUP BY 1, 2
+    ORDER BY 1, 3 DESC
+    """
+    df = to_pandas(cached_query(sql))
+    return (df.loc[df["dim"] == "product_category", "value"].tolist(),
+            df.loc[df["dim"] == "transport_mode", "value"].tolist())
+
+
+@tagged("dashboard:metrics")
+def metrics(categories=None, modes=None):
+    # product-level cards: averages over the products in the slice, not over their facts
+    df = _run("""
+    SELECT
+        count(*) AS n_rows,
+        COALESCE(sum(total_revenue), 0) AS total_revenue,
+        avg(defect_rate) AS avg_defect_rate,
+        avg(shipping_cost) AS avg_shipping_cost,
+        avg(lead_time) AS avg_lead_time
+    FROM filtered
+    """, categories, modes)
+    # plain floats for the cards: an empty slice averages to NaN rather than pd.NA
+    return df.iloc[0].astype("float64")
+
+
+@tagged("dashboard:top_suppliers")
+def top_suppliers(categories=None, modes=None, n=10):
+    return aggregate(["supplier_name"], ["total_revenue"], categories, modes,
+                     order_by="total_revenue DESC", limit=n)
+
+
+@tagged("dashboard:carrier_performance")
+def carrier_performance(categories=None, modes=None):
+    df = aggregate(["shipping_carrier"], ["avg_shipping_cost", "avg_lead_time"], categories, modes,
+                   order_by="shipping_carrier")
+    return df.rename(columns={"avg_shipping_cost": "shipping_cost", "avg_lead_time": "lead_time"})
+
+
+@tagged("dashboard:stockout_risk")
+def stockout_risk(categories=None, modes=None, n=10):
+    return _run("""
+    SELECT
+        product_id, product_category, stock_level, total_sold,
+        total_sold / (stock_level + 1) AS turnover_risk
+    FROM filtered
+    ORDER BY turnover_risk DESC
+    LIMIT ?
+    """, categories, modes, [n])
+
+
+@tagged("dashboard:detail_rows")
+def detail_rows(categories=None, modes=None, limit=RAW_LIMIT):
+    return _run("""
+    SELECT *
+    FROM filtered
+    ORDER BY total_revenue DESC
+    LIMIT ?
+    """, categories, modes, [limit])
@@ -1,8 +1,456 @@
+import atexit
+import contextvars
+import datetime
+import functools
+import json
+import os
+import tempfile
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import contextmanager
+
 import duckdb
+import pandas as pd
+
+DB_PATH = os.environ.get("SUPPLY_CHAIN_DB", "T:/supply-chain-lakehouse/warehouse/supply_chain.duckdb")
+QUERY_LOG_SIZE = int(os.environ.get("SUPPLY_CHAIN_QUERY_LOG_SIZE", 2000))
+# capture DuckDB's JSON profile for queries slower than this many ms (unset = off)
+PROFILE_MS = float(os.environ["SUPPLY_CHAIN_PROFILE_MS"]) if os.environ.get("SUPPLY_CHAIN_PROFILE_MS") else None
+# optional separate DuckDB file that every query record is also appended to
+METRICS_DB = os.environ.get("SUPPLY_CHAIN_METRICS_DB")
+# blue/green mode (scripts/publish_warehouse.py): read the snapshot CURRENT points at
+SNAPSHOT_DIR = os.environ.get("SUPPLY_CHAIN_SNAPSHOT_DIR")
+SNAPSHOT_POINTER = "CURRENT"
+SNAPSHOT_CHECK_INTERVAL = 2.0
+# close the live warehouse file after this many idle seconds so loaders and dbt can take its
+# lock between sessions, e.g. 300 (unset = off: the instance stays open, use snapshot mode)
+IDLE_CLOSE = (float(os.environ["SUPPLY_CHAIN_DB_IDLE_CLOSE"])
+              if os.environ.get("SUPPLY_CHAIN_DB_IDLE_CLOSE") else None)
+
+
+def current_snapshot(snapshot_dir=SNAPSHOT_DIR):
+    """Database file of the published snapshot, or None (no snapshot dir / nothing published)."""
+    if not snapshot_dir:
+        return None
+    try:
+        with open(os.path.join(snapshot_dir, SNAPSHOT_POINTER), encoding="utf-8") as f:
+            rel = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return os.path.join(snapshot_dir, rel) if rel else None
+
+
+class ConnectionManager:
+    """Holds one DuckDB database instance per process and hands out one cursor per thread.
+
+    Cursors share the instance (buffer pool, catalog, file handle), so Streamlit reruns and
+    concurrent sessions stop reopening the file. The instance is read-only by default so the
+    app never takes the write lock.
+
+    Queries run inside lease(). Even a read-only instance holds a file lock that makes
+    read-write opens fail, so with `idle_close` set the instance (and every cursor on it) is
+    closed once no lease has been active for that many seconds. Loaders and dbt can then
+    write between interactions, and the next query reopens the file and sees their changes.
+
+    With `snapshot_dir`, the path follows the published snapshot: the pointer is re-read at
+    most every SNAPSHOT_CHECK_INTERVAL seconds and a new version is opened on the next
+    query. The old instance is not closed; it goes away once its last cursor does.
+    """
+
+    def __init__(self, path=DB_PATH, read_only=True, threads=None, memory_limit=None, snapshot_dir=None,
+                 idle_close=None):
+        self.path = path
+        self.read_only = read_only
+        self.threads = threads
+        self.memory_limit = memory_limit
+        self.snapshot_dir = snapshot_dir
+        self.idle_close = idle_close
+        self._db = None
+        self._db_path = None
+        self._cursors = []
+        self._active = 0
+        self._released = 0.0
+        self._timer = None
+        self._checked = 0.0
+        self._lock = threading.RLock()
+        self._local = threading.local()
+
+    def _config(self):
+        config = {}
+        if self.threads:
+            config["threads"] = int(self.threads)
+        if self.memory_limit:
+            config["memory_limit"] = str(self.memory_limit)
+        return config
+
+    def _follow_snapshot(self):
+        now = time.monotonic()
+        if self.snapshot_dir and now - self._checked >= SNAPSHOT_CHECK_INTERVAL:
+            self._checked = now
+            self.path = current_snapshot(self.snapshot_dir) or self.path
+
+    def database(self):
+        self._follow_snapshot()
+        if self._db is None or self._db_path != self.path:
+            with self._lock:
+                if self._db is None or self._db_path != self.path:
+                    self._db = duckdb.connect(self.path, read_only=self.read_only, config=self._config())
+                    self._db_path = self.path
+                    self._cursors = []
+        return self._db
+
+    def cursor(self, private=False):
+        """The calling thread's cursor, or with `private` a new one (the caller closes it)."""
+        with self._lock:
+            db = self.database()
+            if private:
+                cur = db.cursor()
+                self._cursors.append(cur)
+                return cur
+            cur = getattr(self._local, "cursor", None)
+            # a cursor from a previous instance (after an idle close or a snapshot switch) is dead
+            if cur is None or getattr(self._local, "db", None) is not db:
+                cur = db.cursor()
+                self._cursors.append(cur)
+                self._local.cursor = cur
+                self._local.db = db
+            return cur
+
+    @contextmanager
+    def lease(self, private=False):
+        """Yield a cursor and keep the instance open until the block exits."""
+        with self._lock:
+            self._active += 1
+        try:
+            cur = self.cursor(private)
+            try:
+                yield cur
+            finally:
+                if private:
+                    _close_cursor(cur)
+                    with self._lock:
+                        if cur in self._cursors:
+                            self._cursors.remove(cur)
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._released = time.monotonic()
+                if self._active == 0 and self.idle_close is not None and self._timer is None:
+                    self._timer = threading.Timer(self.idle_close, self._close_if_idle)
+                    self._timer.daemon = True
+                    self._timer.start()
+
+    def _close_if_idle(self):
+        with self._lock:
+            self._timer = None
+            if self._active:
+                return
+            wait = self.idle_close - (time.monotonic() - self._released)
+            if wait > 0:
+                # released again since the timer started: wait out the rest of the window
+                self._timer = threading.Timer(wait, self._close_if_idle)
+                self._timer.daemon = True
+                self._timer.start()
+                return
+            self.close()
+
+    def close(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            cursors, self._cursors = self._cursors, []
+            for cur in cursors:
+                _close_cursor(cur)
+            if self._db is not None:
+                try:
+                    self._db.close()
+                finally:
+                    self._db = None
+                    self._db_path = None
+
+
+_manager = ConnectionManager(
+    path=current_snapshot() or DB_PATH,
+    snapshot_dir=SNAPSHOT_DIR,
+    # published snapshots are never written to, so only the live file is released when idle
+    idle_close=None if SNAPSHOT_DIR else IDLE_CLOSE,
+    threads=os.environ.get("SUPPLY_CHAIN_DB_THREADS"),
+    memory_limit=os.environ.get("SUPPLY_CHAIN_DB_MEMORY_LIMIT"),
+)
+atexit.register(_manager.close)
+
+
+def db_path():
+    _manager._follow_snapshot()
+    return _manager.path
+
+
+def connection(private=False):
+    """Context manager yielding a cursor on the shared instance, kept open for the block.
+
+    With `private` the cursor is the block's own (e.g. for a query that may be interrupted)
+    and is closed on exit; otherwise it is the calling thread's cursor.
+    """
+    return _manager.lease(private)
+
+
+def to_pandas(table):
+    """Arrow table -> pandas with Arrow-backed dtypes (no object columns for strings)."""
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+# ---------------------------------------------------------------------------------------
+# Query instrumentation: every query is tagged with its caller (query_tag / tagged) and
+# recorded with wall time, rows and bytes in an in-memory ring buffer, optionally also in
+# a metrics table in METRICS_DB.
+# ---------------------------------------------------------------------------------------
+
+UNTAGGED = "untagged"
+_tag = contextvars.ContextVar("query_tag", default=UNTAGGED)
+
+
+@contextmanager
+def query_tag(tag):
+    """Tag every query issued inside the block (e.g. "dashboard:metrics")."""
+    token = _tag.set(tag)
+    try:
+        yield
+    finally:
+        _tag.reset(token)
+
+
+def tagged(tag):
+    """Decorator form of query_tag."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with query_tag(tag):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def current_tag():
+    return _tag.get()
+
+
+METRICS_DDL = """
+CREATE TABLE IF NOT EXISTS query_metrics (
+  recorded_at TIMESTAMP,
+  tag VARCHAR,
+  sql VARCHAR,
+  seconds DOUBLE,
+  rows BIGINT,
+  bytes BIGINT,
+  profile VARCHAR
+)
+"""
+
+SUMMARY_SQL = """
+SELECT
+  tag,
+  count(*) AS queries,
+  quantile_cont(seconds, 0.50) * 1000 AS p50_ms,
+  quantile_cont(seconds, 0.95) * 1000 AS p95_ms,
+  quantile_cont(seconds, 0.99) * 1000 AS p99_ms,
+  max(seconds) * 1000 AS max_ms,
+  avg(rows) AS avg_rows,
+  sum(bytes) AS total_bytes
+FROM query_metrics
+GROUP BY tag
+ORDER BY p95_ms DESC
+"""
+
+
+class QueryLog:
+    """Ring buffer of the last `size` query records, mirrored to `metrics_db` when set."""
+
+    def __init__(self, size=QUERY_LOG_SIZE, metrics_db=None):
+        self._records = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.metrics_db = metrics_db
+        self._metrics = None
+
+    def _metrics_con(self):
+        if self._metrics is None:
+            self._metrics = duckdb.connect(self.metrics_db)
+            self._metrics.execute(METRICS_DDL)
+        return self._metrics
+
+    def record(self, sql, seconds, rows=None, nbytes=None, tag=None, profile=None):
+        rec = {
+            "recorded_at": datetime.datetime.now(),
+            "tag": tag or current_tag(),
+            "sql": " ".join(sql.split())[:500],
+            "seconds": seconds,
+            "rows": rows,
+            "bytes": nbytes,
+            "profile": profile,
+        }
+        with self._lock:
+            self._records.append(rec)
+            if self.metrics_db:
+                try:
+                    self._metrics_con().execute(
+                        "INSERT INTO query_metrics VALUES (?, ?, ?, ?, ?, ?, ?)", list(rec.values()))
+                except duckdb.Error:
+                    # metrics are best effort; never fail the query that is being measured
+                    pass
+        return rec
+
+    def records(self):
+        with self._lock:
+            return list(self._records)
+
+    def summary(self, persisted=False):
+        """p50/p95/p99 per tag as a pyarrow.Table, over the ring buffer or the metrics table."""
+        if persisted:
+            if not self.metrics_db:
+                return None
+            with self._lock:
+                return self._metrics_con().execute(SUMMARY_SQL).fetch_arrow_table()
+        records = self.records()
+        if not records:
+            return None
+        import pyarrow as pa
+        con = duckdb.connect()
+        con.register("query_metrics", pa.Table.from_pylist(records))
+        try:
+            return con.execute(SUMMARY_SQL).fetch_arrow_table()
+        finally:
+            con.close()
+
+    def close(self):
+        with self._lock:
+            if self._metrics is not None:
+                self._metrics.close()
+                self._metrics = None
+
+
+_log = QueryLog(metrics_db=METRICS_DB)
+atexit.register(_log.close)
+
+# cursor -> its profile file; the entry goes away with the cursor
+_profile_paths = weakref.WeakKeyDictionary()
+
+
+def _profile_path(con):
+    """Enable JSON profiling on `con` (once) and return the file its last profile lands in.
+
+    The file is deleted when the cursor is closed by the manager or garbage-collected.
+    """
+    path = _profile_paths.get(con)
+    if path is None:
+        fd, path = tempfile.mkstemp(prefix=f"duckdb_profile_{os.getpid()}_", suffix=".json")
+        os.close(fd)
+        con.execute("PRAGMA enable_profiling='json'")
+        con.execute("PRAGMA profiling_output='{}'".format(path.replace("'", "''")))
+        _profile_paths[con] = path
+        weakref.finalize(con, _remove_file, path)
+    return path
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _close_cursor(cur):
+    try:
+        cur.close()
+    except duckdb.Error:
+        pass
+    path = _profile_paths.pop(cur, None)
+    if path is not None:
+        _remove_file(path)
+
+
+def _read_profile(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.dumps(json.load(f))
+    except (OSError, ValueError):
+        return None
+
+
+def record_query(sql, seconds, rows=None, nbytes=None, tag=None, profile=None):
+    """Record a query that was executed outside fetch_arrow (e.g. a paged explorer stream)."""
+    return _log.record(sql, seconds, rows, nbytes, tag, profile)
+
+
+def query_log():
+    return _log.records()
+
+
+def query_summary(persisted=False):
+    return _log.summary(persisted)
+
+
+def fetch_arrow(sql, params=None, con=None, tag=None):
+    if con is None:
+        with connection() as con:
+            return fetch_arrow(sql, params, con, tag)
+    path = _profile_path(con) if PROFILE_MS is not None else None
+    t0 = time.perf_counter()
+    table = con.execute(sql, params or []).fetch_arrow_table()
+    seconds = time.perf_counter() - t0
+    profile = _read_profile(path) if path and seconds * 1000 >= PROFILE_MS else None
+    _log.record(sql, seconds, table.num_rows, table.nbytes, tag, profile)
+    return table
+
+
+def fetch_batches(sql, params=None, batch_size=100_000, con=None, tag=None):
+    """Stream a result as a pyarrow.RecordBatchReader of ~batch_size rows.
+
+    The query is recorded once the stream is exhausted or closed, with the time spent
+    producing batches (not the consumer's time between them).
+    """
+    import pyarrow as pa
+
+    lease = None
+    if con is None:
+        # a private cursor, held (with the instance) until the stream is exhausted or closed
+        lease = connection(private=True)
+        con = lease.__enter__()
+    tag = tag or current_tag()
+    t0 = time.perf_counter()
+    try:
+        reader = con.execute(sql, params or []).fetch_record_batch(batch_size)
+    except BaseException:
+        if lease is not None:
+            lease.__exit__(None, None, None)
+        raise
+    spent = time.perf_counter() - t0
+
+    def batches():
+        nonlocal spent
+        rows = nbytes = 0
+        try:
+            while True:
+                t = time.perf_counter()
+                try:
+                    batch = reader.read_next_batch()
+                except StopIteration:
+                    spent += time.perf_counter() - t
+                    return
+                spent += time.perf_counter() - t
+                rows += batch.num_rows
+                nbytes += batch.nbytes
+                yield batch
+        finally:
+            _log.record(sql, spent, rows, nbytes, tag)
+            if lease is not None:
+                lease.__exit__(None, None, None)
+
+    return pa.RecordBatchReader.from_batches(reader.schema, batches())
 
-def get_conn():
-    return duckdb.connect("T:/supply-chain-lakehouse/warehouse/supply_chain.duckdb")
 
-def load_table(table_name: str):
-    con = get_conn()
-    return con.execute(f"SELECT * FROM {table_name}").fetchdf()
+def load_table(table_name: str, as_arrow=False):
+    tag = None if current_tag() != UNTAGGED else f"load_table:{table_name}"
+    table = fetch_arrow(f"SELECT * FROM {table_name}", tag=tag)
+    return table if as_arrow else to_pandas(table)
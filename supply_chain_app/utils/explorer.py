@@ -0,0 +1,198 @@
+import os
+import threading
+import time
+
+import duckdb
+import pyarrow as pa
+
+from utils.duckdb_conn import connection, fetch_arrow, record_query
+
+DEFAULT_PAGE_SIZE = 500
+DEFAULT_MAX_ROWS = int(os.environ.get("EXPLORER_MAX_ROWS", 50_000))
+DEFAULT_MAX_BYTES = int(os.environ.get("EXPLORER_MAX_BYTES", 64 * 1024 * 1024))
+DEFAULT_TIMEOUT = float(os.environ.get("EXPLORER_TIMEOUT", 30))
+# a partly fetched query left alone this long is closed, releasing its hold on the database
+DEFAULT_IDLE_TIMEOUT = float(os.environ.get("EXPLORER_IDLE_TIMEOUT", 60))
+
+
+def _clean(sql):
+    return sql.strip().rstrip(";").strip()
+
+
+class _Deadline:
+    """Interrupts `cur` if the wrapped call runs longer than `timeout` seconds."""
+
+    def __init__(self, cur, timeout):
+        self.cur = cur
+        self.timeout = timeout
+        self.fired = False
+
+    def _fire(self):
+        self.fired = True
+        self.cur.interrupt()
+
+    def __enter__(self):
+        self.timer = threading.Timer(self.timeout, self._fire)
+        self.timer.daemon = True
+        self.timer.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.cancel()
+        return False
+
+
+class PagedQuery:
+    """Server-side cursor over a user query, fetched one page at a time.
+
+    Each page is pulled from a DuckDB record-batch stream on a private cursor, so nothing
+    beyond the pages actually requested is materialized. Fetching stops at `max_rows` /
+    `max_bytes`, every DuckDB call is interrupted after `timeout` seconds, and cancel()
+    interrupts whatever is running. While the stream is open it keeps the shared database
+    instance open, so a query with no page requested for `idle_timeout` seconds (e.g. an
+    abandoned session) is closed and cannot block writers indefinitely.
+    """
+
+    def __init__(self, sql, page_size=DEFAULT_PAGE_SIZE, max_rows=DEFAULT_MAX_ROWS,
+                 max_bytes=DEFAULT_MAX_BYTES, timeout=DEFAULT_TIMEOUT, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.sql = _clean(sql)
+        self.page_size = page_size
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.rows = 0
+        self.bytes = 0
+        self.elapsed = 0.0
+        self.done = False
+        self.reason = None
+        self._cur = None
+        self._lease = None
+        self._reader = None
+        self._pending = None
+        self._idle = None
+        self._lock = threading.RLock()
+
+    def _call(self, fn):
+        t0 = time.perf_counter()
+        deadline = _Deadline(self._cur, self.timeout)
+        try:
+            with deadline:
+                return fn()
+        except duckdb.InterruptException:
+            self._finish("timed out" if deadline.fired else "cancelled")
+            return None
+        finally:
+            self.elapsed += time.perf_counter() - t0
+
+    def start(self):
+        with self._lock:
+            self._lease = connection(private=True)
+            self._cur = self._lease.__enter__()
+            try:
+                self._reader = self._call(lambda: self._cur.execute(self.sql).fetch_record_batch(self.page_size))
+            except Exception:
+                # e.g. a syntax error: the failed query must not keep the instance open
+                self._close()
+                raise
+            self._arm_idle()
+        return self
+
+    def _arm_idle(self):
+        if self._idle is not None:
+            self._idle.cancel()
+            self._idle = None
+        if not self.done and self.idle_timeout:
+            self._idle = threading.Timer(self.idle_timeout, self._expire)
+            self._idle.daemon = True
+            self._idle.start()
+
+    def _expire(self):
+        with self._lock:
+            if not self.done:
+                self._finish(f"closed after {self.idle_timeout:.0f}s without a page request")
+
+    def next_page(self):
+        """Next page as a pyarrow.Table, or None once the stream is exhausted, capped or expired."""
+        with self._lock:
+            try:
+                return self._next_page()
+            finally:
+                self._arm_idle()
+
+    def _next_page(self):
+        if self.done or self._reader is None:
+            return None
+        batches, n = [], 0
+        while n < self.page_size:
+            batch = self._pending or self._call(self._read_batch)
+            self._pending = None
+            if batch is None:
+                if not self.done:
+                    self._finish("complete")
+                break
+            room = min(self.page_size - n, self.max_rows - self.rows - n)
+            if batch.num_rows > room:
+                batch, self._pending = batch.slice(0, room), batch.slice(room)
+            batches.append(batch)
+            n += batch.num_rows
+            if self.rows + n >= self.max_rows:
+                self._finish(f"row cap ({self.max_rows:,}) reached")
+                break
+            if self.bytes + sum(b.nbytes for b in batches) >= self.max_bytes:
+                self._finish(f"byte cap ({self.max_bytes / 1e6:.0f} MB) reached")
+                break
+        if not batches:
+            return None
+        page = pa.Table.from_batches(batches)
+        self.rows += page.num_rows
+        self.bytes += page.nbytes
+        return page
+
+    def _read_batch(self):
+        try:
+            return self._reader.read_next_batch()
+        except StopIteration:
+            return None
+
+    def _finish(self, reason):
+        if not self.done:
+            record_query(self.sql, self.elapsed, self.rows, self.bytes, tag="explorer")
+        self.done = True
+        self.reason = reason
+        self._close()
+
+    def cancel(self):
+        # interrupt first: a page being fetched holds the lock until DuckDB gives up
+        cur = self._cur
+        if cur is not None:
+            cur.interrupt()
+        with self._lock:
+            self._finish("cancelled")
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if self._idle is not None:
+            self._idle.cancel()
+            self._idle = None
+        self._reader = None
+        self._pending = None
+        if self._lease is not None:
+            # closes the private cursor and lets the shared instance idle out
+            try:
+                self._lease.__exit__(None, None, None)
+            except Exception:
+                pass
+            self._lease = None
+        self._cur = None
+
+
+def profile(sql, timeout=DEFAULT_TIMEOUT):
+    """Run EXPLAIN ANALYZE and return DuckDB's operator tree with per-operator timings."""
+    with connection(private=True) as cur:
+        with _Deadline(cur, timeout):
+            plan = fetch_arrow("EXPLAIN ANALYZE " + _clean(sql), con=cur, tag="explorer:profile")
+        return "\n".join(plan.column(plan.num_columns - 1).to_pylist())
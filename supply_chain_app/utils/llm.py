@@ -1,6 +1,7 @@
-import google.generativeai as genai
-
 def supply_chain_insight(df, query, api_key):
+    # imported on first use: the SDK is slow to import and only this tab needs it
+    import google.generativeai as genai
+
     genai.configure(api_key=api_key)
     model = genai.GenerativeModel("gemini-2.0-flash")
 
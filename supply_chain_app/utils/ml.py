@@ -2,139 +2,274 @@
 import os
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
+from utils import model_registry
+from utils.duckdb_conn import fetch_batches
 
 MODELPATH = os.path.join("models", "delay_predictor.pkl")
 FEATURES = ["supplier_lead_time_days", "defect_rate", "shipping_cost"]
+FEATURE_ALIASES = {
+    "supplier_lead_time_days": ["lead_time_meta", "supplier_lead_time"],
+    "defect_rate": ["defect_rates", "avg_defect_rate"],
+    "shipping_cost": ["transport_cost", "transport_costs", "shipping_costs"]
+}
 
 def ensure_models_dir():
     os.makedirs("models", exist_ok=True)
 
-def train_model_from_df(df, save=True):
+def training_matrix(df):
     if "delay_flag" not in df.columns:
         raise ValueError("train_model_from_df requires 'delay_flag' column")
-
     X = df[FEATURES].fillna(0)
     y = df["delay_flag"].astype(int)
+    return X, y
+
+def fit_model(X, y, n_estimators=100, n_jobs=None, random_state=42, base_model=None, **params):
+    """Fit a RandomForest. With `base_model`, grow that ensemble by `n_estimators` new trees
+    fitted on (X, y) instead of starting over (warm start)."""
+    # sklearn is imported on first fit: the app only unpickles fitted models
+    from sklearn.ensemble import RandomForestClassifier
 
-    model = RandomForestClassifier(n_estimators=100, random_state=42)
+    if base_model is not None:
+        model = base_model
+        model.set_params(warm_start=True, n_estimators=len(model.estimators_) + n_estimators,
+                         n_jobs=n_jobs)
+    else:
+        model = RandomForestClassifier(n_estimators=n_estimators, random_state=random_state,
+                                       n_jobs=n_jobs, **params)
     model.fit(X, y)
+    return model
+
+def train_model_from_df(df, save=True, data_version=None, max_loaded_at=None, **fit_kwargs):
+    """Fit on `df` and, with `save`, register the model.
+
+    `max_loaded_at` is the fact_sales watermark `df` was built up to; without it the
+    registered model cannot be grown with `train_model.py --warm-start`.
+    """
+    X, y = training_matrix(df)
+    model = fit_model(X, y, **fit_kwargs)
 
     if save:
         ensure_models_dir()
-        with open(MODELPATH, "wb") as f:
-            pickle.dump(model, f)
+        model_registry.save_model(model, FEATURES, training_rows=len(df), data_version=data_version,
+                                  max_loaded_at=max_loaded_at)
 
     return model
 
 def load_model():
+    """Latest registered model, cached in-process and reloaded only when a new version lands.
+
+    Falls back to the legacy pickle at MODELPATH when the registry is empty.
+    """
+    try:
+        return model_registry.get_model()
+    except FileNotFoundError:
+        pass
     if not os.path.exists(MODELPATH):
         raise FileNotFoundError(f"Model file missing: {MODELPATH}")
     with open(MODELPATH, "rb") as f:
         return pickle.load(f)
 
-def _get_value_from_row(row_like, key, fallbacks=None):
-    if fallbacks is None:
-        fallbacks = []
+def resolve_feature_columns(columns):
+    """Map each FEATURE to a column name once per schema.
 
-    if hasattr(row_like, "to_dict"):
-        data = row_like.to_dict()
-    elif isinstance(row_like, dict):
-        data = row_like
-    else:
-        try:
-            data = dict(row_like)
-        except:
-            data = {}
-
-    # 1. Exact match
-    if key in data:
-        return data[key]
-
-    # 2. Fallback list
-    for fb in fallbacks:
-        if fb in data:
-            return data[fb]
-
-    # 3. Case insensitive
-    key_lower = key.lower()
-    for k in data:
-        if str(k).lower() == key_lower:
-            return data[k]
-
-    # 4. Remove underscores / spaces
-    norm = key_lower.replace("_", "").replace(" ", "")
-    for k in data:
-        if str(k).lower().replace("_", "").replace(" ", "") == norm:
-            return data[k]
-
-    # 5. Smart alias mapping
-    alt = {
-        "supplier_lead_time_days": ["lead_time_meta", "supplier_lead_time"],
-        "defect_rate": ["defect_rates", "avg_defect_rate"],
-        "shipping_cost": ["transport_cost", "transport_costs", "shipping_costs"]
-    }
-
-    for alias in alt.get(key, []):
-        if alias in data:
-            return data[alias]
-        for k in data:
-            if str(k).lower() == alias.lower():
-                return data[k]
-
-    return 0
+    Precedence: exact, case-insensitive, without underscores/spaces, then the alias table.
+    Unresolved features map to None (scored as 0).
+    """
+    columns = [str(c) for c in columns]
+    lower = {}
+    norm = {}
+    for c in columns:
+        lower.setdefault(c.lower(), c)
+        norm.setdefault(c.lower().replace("_", "").replace(" ", ""), c)
+
+    mapping = {}
+    for feat in FEATURES:
+        key_lower = feat.lower()
+        col = None
+        if feat in columns:
+            col = feat
+        elif key_lower in lower:
+            col = lower[key_lower]
+        elif key_lower.replace("_", "").replace(" ", "") in norm:
+            col = norm[key_lower.replace("_", "").replace(" ", "")]
+        else:
+            for alias in FEATURE_ALIASES.get(feat, []):
+                if alias in columns:
+                    col = alias
+                    break
+                if alias.lower() in lower:
+                    col = lower[alias.lower()]
+                    break
+        mapping[feat] = col
+    return mapping
+
+def _columns_of(data):
+    if hasattr(data, "schema") and hasattr(data.schema, "names"):
+        return data.schema.names
+    return list(data.columns)
+
+def _column_values(data, col):
+    if hasattr(data, "schema") and hasattr(data.schema, "names"):
+        return data.column(col).to_numpy(zero_copy_only=False)
+    return data[col].to_numpy()
+
+def build_feature_matrix(data, mapping=None):
+    """Feature matrix (n x len(FEATURES), float) from a DataFrame or Arrow table/batch in one pass."""
+    if mapping is None:
+        mapping = resolve_feature_columns(_columns_of(data))
+    n = len(data) if not hasattr(data, "num_rows") else data.num_rows
+    X = np.zeros((n, len(FEATURES)), dtype=float)
+    for j, feat in enumerate(FEATURES):
+        col = mapping.get(feat)
+        if col is None:
+            continue
+        vals = pd.to_numeric(pd.Series(_column_values(data, col)), errors="coerce")
+        X[:, j] = vals.fillna(0).to_numpy(dtype=float)
+    return X
+
+def _score(model, X):
+    if hasattr(model, "feature_names_in_"):
+        # fitted on a DataFrame: keep the names so sklearn does not warn on every chunk
+        X = pd.DataFrame(X, columns=FEATURES)
+    if hasattr(model, "predict_proba"):
+        return model.predict_proba(X)[:, 1].astype(float)
+    return model.predict(X).astype(float)
+
+def predict_delay_batch(model, data, chunk_size=100_000, mapping=None):
+    """Delay probability for every row of a DataFrame / Arrow table, scored in chunks."""
+    if mapping is None:
+        mapping = resolve_feature_columns(_columns_of(data))
+    X = build_feature_matrix(data, mapping)
+    if len(X) == 0:
+        return np.zeros(0, dtype=float)
+    return np.concatenate([_score(model, X[i:i + chunk_size]) for i in range(0, len(X), chunk_size)])
 
 def predict_delay(model, row):
     if isinstance(row, pd.DataFrame):
-        row = row.iloc[0]
+        row = row.iloc[[0]]
+    elif isinstance(row, pd.Series):
+        row = row.to_frame().T
+    else:
+        row = pd.DataFrame([dict(row)])
+    return float(predict_delay_batch(model, row)[0])
 
-    vals = []
-    for feat in FEATURES:
-        v = _get_value_from_row(row, feat)
-        try:
-            vals.append(float(v))
-        except:
-            vals.append(0.0)
+SCORING_SQL = """
+SELECT
+  fact_id,
+  product_id,
+  supplier_lead_time_days,
+  defect_rate,
+  COALESCE(shipping_cost, transport_cost) AS shipping_cost
+FROM fact_sales
+"""
 
-    X = np.array(vals, dtype=float).reshape(1, -1)
+def score_to_table(con, model, batches, table="delay_predictions", key_cols=("fact_id", "product_id")):
+    """Score an iterable of Arrow record batches and (re)write the results to `table`.
 
-    if hasattr(model, "predict_proba"):
-        return float(model.predict_proba(X)[0][1])
-    return float(model.predict(X)[0])
+    `con` must be writable. Columns are resolved to features once, from the first batch.
+    Returns the number of rows written.
+    """
+    import pyarrow as pa
+
+    con.execute(f"""
+        CREATE OR REPLACE TABLE {table} (
+          {", ".join(f"{c} VARCHAR" for c in key_cols)},
+          delay_probability DOUBLE,
+          scored_at TIMESTAMP
+        )""")
+    mapping = None
+    total = 0
+    for batch in batches:
+        if mapping is None:
+            mapping = resolve_feature_columns(batch.schema.names)
+        probs = predict_delay_batch(model, batch, mapping=mapping)
+        out = pa.table({**{c: batch.column(c).cast(pa.string()) for c in key_cols},
+                        "delay_probability": probs})
+        con.register("_delay_scores", out)
+        con.execute(f"INSERT INTO {table} SELECT *, current_timestamp FROM _delay_scores")
+        con.unregister("_delay_scores")
+        total += batch.num_rows
+    return total
 
-def prepare_training_df_from_duckdb(con):
-    sql = """
+TRAINING_SQL = """
+WITH base AS (
+    -- one row per fact; the features are carried on the fact from its own staged row
     SELECT
-      f.product_id,
-      f.quantity_sold,
-      f.revenue,
-      COALESCE(ss.supplier_lead_time_days, 0) AS supplier_lead_time_days,
-      COALESCE(ss.defect_rate, 0) AS defect_rate,
-      COALESCE(ss.shipping_cost, ss.transport_cost, 0) AS shipping_cost,
-      COALESCE(ss.shipping_time_days, 0) AS shipping_time_days
-    FROM fact_sales f
-    LEFT JOIN stg_supply_chain ss
-      ON f.product_id = ss.product_id
-    WHERE ss.supplier_name IS NOT NULL
+      fact_id,
+      loaded_at,
+      COALESCE(supplier_lead_time_days, 0) AS supplier_lead_time_days,
+      COALESCE(defect_rate, 0) AS defect_rate,
+      COALESCE(shipping_cost, transport_cost, 0) AS shipping_cost,
+      COALESCE(shipping_time_days, 0) AS shipping_time_days
+    FROM fact_sales
+    WHERE supplier_name IS NOT NULL
+    QUALIFY row_number() OVER (PARTITION BY fact_id) = 1
+),
+threshold AS (
+    -- label threshold over the whole population, so samples and increments share it
+    SELECT greatest(1.0, median(shipping_time_days)) AS t FROM base
+),
+labeled AS (
+    SELECT base.*, CAST(base.shipping_time_days > threshold.t AS INTEGER) AS delay_flag
+    FROM base, threshold
+)
+"""
+
+TRAINING_COLUMNS = ", ".join(FEATURES + ["delay_flag"])
+
+def training_query(sample_rows=None, stratify=False, since=None, seed=42):
+    """SQL + params for the labeled feature set (FEATURES + delay_flag).
+
+    sample_rows: reservoir sample of that many rows; with stratify=True the sample keeps each
+    delay_flag class at its population share. since: only facts loaded after this timestamp
+    (the new batch, for warm-start growth).
     """
+    where, params = "", []
+    if since is not None:
+        where = "WHERE loaded_at > ?"
+        params.append(since)
 
-    df = con.execute(sql).fetchdf()
-    if df.empty:
-        raise ValueError("No training data returned — check joins.")
+    if sample_rows and stratify:
+        sql = TRAINING_SQL + f"""
+        SELECT {TRAINING_COLUMNS} FROM labeled {where}
+        QUALIFY row_number() OVER (PARTITION BY delay_flag ORDER BY hash(fact_id, {int(seed)}))
+            <= ceil(? * count(*) OVER (PARTITION BY delay_flag) / count(*) OVER ())
+        """
+        params.append(int(sample_rows))
+    elif sample_rows:
+        sql = TRAINING_SQL + (f"SELECT {TRAINING_COLUMNS} FROM labeled {where} "
+                              f"USING SAMPLE reservoir({int(sample_rows)} ROWS) REPEATABLE ({int(seed)})")
+    else:
+        sql = TRAINING_SQL + f"SELECT {TRAINING_COLUMNS} FROM labeled {where}"
+    return sql, params
 
-    median_time = float(df["shipping_time_days"].median())
-    threshold = max(1.0, median_time)
+def iter_training_batches(con, batch_size=100_000, **query_kwargs):
+    """Stream the labeled feature set as pyarrow.RecordBatches of ~batch_size rows."""
+    sql, params = training_query(**query_kwargs)
+    yield from fetch_batches(sql, params, batch_size, con=con, tag="ml:training")
 
-    df["delay_flag"] = (df["shipping_time_days"] > threshold).astype(int)
+def prepare_training_df_from_duckdb(con, batch_size=100_000, **query_kwargs):
+    """Training frame (FEATURES as float32 + delay_flag), assembled batch by batch.
 
-    for col in FEATURES + ["delay_flag"]:
-        if col not in df:
-            df[col] = 0
+    Only the numeric columns leave DuckDB, so the peak is roughly the final frame plus one
+    batch; joins, labels and sampling spill under the connection's memory_limit/temp_directory.
+    """
+    features, labels = {f: [] for f in FEATURES}, []
+    for batch in iter_training_batches(con, batch_size, **query_kwargs):
+        for f in FEATURES:
+            features[f].append(batch.column(f).to_numpy(zero_copy_only=False).astype(np.float32))
+        labels.append(batch.column("delay_flag").to_numpy(zero_copy_only=False).astype(np.int8))
+    if not sum(len(part) for part in labels):
+        raise ValueError("No training data returned — check joins.")
 
-    return df[FEATURES + ["delay_flag"]]
+    df = pd.DataFrame({f: np.concatenate(parts) for f, parts in features.items()})
+    df["delay_flag"] = np.concatenate(labels)
+    return df
 
 def train_model(df_or_con):
     if hasattr(df_or_con, "execute"):
+        # watermark first: facts landing during the query are picked up by the next warm start
+        watermark = df_or_con.execute("SELECT max(loaded_at) FROM fact_sales").fetchone()[0]
         df = prepare_training_df_from_duckdb(df_or_con)
-        return train_model_from_df(df)
+        return train_model_from_df(df, max_loaded_at=watermark)
     return train_model_from_df(df_or_con)
@@ -0,0 +1,85 @@
+import numpy as np
+
+from utils.ml import FEATURES, predict_delay_batch
+
+# Feature expressions matching training: fillna(0), then float32 like sklearn's tree input.
+# sklearn compares float32(x) <= float64(threshold); casting to FLOAT in SQL keeps that exact.
+FEATURE_SQL = {f: f"CAST(COALESCE({f}, 0) AS FLOAT)" for f in FEATURES}
+
+
+def _positive_class_index(model):
+    classes = list(getattr(model, "classes_", [0, 1]))
+    if 1 in classes:
+        return classes.index(1)
+    return None
+
+
+def tree_to_sql(estimator, feature_exprs, pos_idx):
+    """One fitted decision tree as a nested CASE returning P(class=1) at its leaves."""
+    t = estimator.tree_
+
+    def node_sql(i):
+        left, right = t.children_left[i], t.children_right[i]
+        if left == right:  # leaf
+            counts = t.value[i][0]
+            total = counts.sum()
+            p = float(counts[pos_idx] / total) if total else 0.0
+            return repr(p)
+        expr = feature_exprs[t.feature[i]]
+        return (f"CASE WHEN {expr} <= {float(t.threshold[i])!r} "
+                f"THEN {node_sql(left)} ELSE {node_sql(right)} END")
+
+    return node_sql(0)
+
+
+def forest_to_sql(model, feature_exprs=None):
+    """SQL expression for the forest's delay probability: mean of the per-tree CASE expressions.
+
+    `feature_exprs` maps each FEATURE to a SQL expression (default: FEATURE_SQL over columns
+    named like the features).
+    """
+    exprs = feature_exprs or FEATURE_SQL
+    feature_sql = [exprs[f] for f in FEATURES]
+    pos_idx = _positive_class_index(model)
+    if pos_idx is None:
+        return "0.0"
+    trees = getattr(model, "estimators_", [model])
+    parts = [tree_to_sql(est, feature_sql, pos_idx) for est in trees]
+    return "((" + ")\n + (".join(parts) + f")) / {len(parts)}.0"
+
+
+def node_count(model):
+    return sum(est.tree_.node_count for est in getattr(model, "estimators_", [model]))
+
+
+def dbt_macro(model, name="delay_probability"):
+    """Jinja macro taking the three feature column names, for use inside dbt models."""
+    args = ", ".join(FEATURES)
+    exprs = {f: f"CAST(COALESCE({{{{ {f} }}}}, 0) AS FLOAT)" for f in FEATURES}
+    return (
+        f"{{# Generated by supply_chain_app/scripts/export_model_sql.py -- do not edit. #}}\n"
+        f"{{% macro {name}({args}) %}}\n"
+        f"{forest_to_sql(model, exprs)}\n"
+        f"{{% endmacro %}}\n"
+    )
+
+
+def register_udf(con, model, name="delay_probability"):
+    """Register a vectorized Arrow UDF name(lead_time, defect_rate, shipping_cost) -> DOUBLE."""
+    import pyarrow as pa
+    try:
+        from duckdb.typing import DOUBLE
+    except ImportError:  # duckdb >= 1.4 moved the type constants
+        from duckdb.sqltypes import DOUBLE
+
+    def score(lead, defect, cost):
+        table = pa.table({FEATURES[0]: lead, FEATURES[1]: defect, FEATURES[2]: cost})
+        return pa.array(predict_delay_batch(model, table), type=pa.float64())
+
+    con.create_function(name, score, [DOUBLE, DOUBLE, DOUBLE], DOUBLE, type="arrow")
+    return name
+
+
+def max_abs_diff(a, b):
+    a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+    return float(np.max(np.abs(a - b))) if len(a) else 0.0
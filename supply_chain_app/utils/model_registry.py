@@ -0,0 +1,131 @@
+import datetime
+import json
+import os
+import threading
+
+import joblib
+
+REGISTRY_DIR = os.path.join("models", "registry")
+LATEST = "LATEST"
+NAME = "delay_predictor"
+
+
+def _path(*parts):
+    return os.path.join(REGISTRY_DIR, *parts)
+
+
+def _write_atomic(path, text):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def list_versions():
+    if not os.path.isdir(REGISTRY_DIR):
+        return []
+    return sorted(f[:-len(".json")] for f in os.listdir(REGISTRY_DIR)
+                  if f.startswith(NAME + "-v") and f.endswith(".json"))
+
+
+def latest_version():
+    try:
+        with open(_path(LATEST), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def save_model(model, features, training_rows, data_version=None, max_loaded_at=None, extra=None):
+    """Store `model` as a new versioned artifact and point LATEST at it.
+
+    The artifact is an uncompressed joblib file so its numpy arrays can be memory-mapped on
+    load; metadata goes next to it as JSON. `max_loaded_at` is the fact_sales watermark the
+    model was trained up to (a warm start only fits facts loaded after it); it is always
+    recorded, as null when unknown. Returns the version string.
+    """
+    os.makedirs(REGISTRY_DIR, exist_ok=True)
+    existing = list_versions()
+    n = int(existing[-1].rsplit("-v", 1)[1]) + 1 if existing else 1
+    version = f"{NAME}-v{n:04d}"
+
+    joblib.dump(model, _path(version + ".joblib"))
+    meta = {
+        "version": version,
+        "artifact": version + ".joblib",
+        "features": list(features),
+        "training_rows": int(training_rows),
+        "data_version": data_version,
+        "max_loaded_at": max_loaded_at.isoformat() if hasattr(max_loaded_at, "isoformat") else max_loaded_at,
+        "created_at": datetime.datetime.utcnow().isoformat() + "Z",
+        "model_class": type(model).__name__,
+        "n_estimators": len(getattr(model, "estimators_", [])) or None,
+    }
+    meta.update(extra or {})
+    _write_atomic(_path(version + ".json"), json.dumps(meta, indent=2))
+    _write_atomic(_path(LATEST), version)
+    return version
+
+
+def load_metadata(version=None):
+    version = version or latest_version()
+    if version is None:
+        return None
+    with open(_path(version + ".json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_artifact(version=None, mmap=True):
+    version = version or latest_version()
+    if version is None:
+        raise FileNotFoundError(f"No model registered in {REGISTRY_DIR}")
+    return joblib.load(_path(version + ".joblib"), mmap_mode="r" if mmap else None)
+
+
+class ModelCache:
+    """Keeps the latest registered model loaded; reloads only when LATEST or the artifact changes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key = None
+        self._model = None
+        self._meta = None
+
+    def _current_key(self):
+        version = latest_version()
+        if version is None:
+            return None
+        try:
+            return version, os.stat(_path(version + ".joblib")).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def get(self):
+        key = self._current_key()
+        if key is None:
+            raise FileNotFoundError(f"No model registered in {REGISTRY_DIR}")
+        if key != self._key:
+            with self._lock:
+                if key != self._key:
+                    self._model = load_artifact(key[0])
+                    self._meta = load_metadata(key[0])
+                    self._key = key
+        return self._model
+
+    def metadata(self):
+        try:
+            self.get()
+        except FileNotFoundError:
+            return None
+        return self._meta
+
+
+_cache = ModelCache()
+
+
+def get_model():
+    return _cache.get()
+
+
+def get_metadata():
+    return _cache.metadata()
@@ -0,0 +1,149 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import duckdb
+
+from utils.duckdb_conn import connection, db_path, fetch_arrow
+
+# cheap probes whose result changes whenever an ingest or a dbt build lands
+VERSION_PROBES = [
+    "SELECT count(*), max(loaded_at) FROM bronze_load_manifest",
+    "SELECT max(loaded_at) FROM fact_sales",
+    "SELECT max(ingest_ts) FROM raw_supply_chain",
+]
+
+
+def normalize_sql(sql):
+    return re.sub(r"\s+", " ", sql).strip().rstrip(";").strip()
+
+
+def warehouse_version(con, path=None):
+    """Token identifying the current warehouse state (file stat + load manifest / ingest watermarks)."""
+    token = []
+    try:
+        st = os.stat(path or db_path())
+        token.append((st.st_mtime_ns, st.st_size))
+    except OSError:
+        token.append(None)
+    for sql in VERSION_PROBES:
+        try:
+            row = fetch_arrow(sql, con=con, tag="cache:version").to_pylist()[0]
+            token.append(tuple(row.values()))
+        except Exception:
+            token.append(None)
+    return repr(token)
+
+
+class QueryCache:
+    """Arrow result cache keyed by (normalized SQL, params, warehouse version).
+
+    Entries are evicted least-recently-used once `max_bytes` is exceeded, expire after `ttl`
+    seconds if set, and are dropped wholesale when the warehouse version changes. The version
+    is re-probed at most every `version_interval` seconds.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, ttl=None, version_interval=2.0):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.version_interval = version_interval
+        self._entries = OrderedDict()  # key -> (table, nbytes, created)
+        self._bytes = 0
+        self._version = None
+        self._version_checked = 0.0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def version(self, con):
+        now = time.monotonic()
+        if self._version is None or now - self._version_checked >= self.version_interval:
+            v = warehouse_version(con)
+            with self._lock:
+                if v != self._version:
+                    if self._version is not None:
+                        self.invalidations += 1
+                    self._entries.clear()
+                    self._bytes = 0
+                    self._version = v
+                self._version_checked = now
+        return self._version
+
+    def query(self, sql, params=None, con=None):
+        """Return the result of `sql` as a pyarrow.Table, from cache when possible.
+
+        While a writer holds the warehouse file (the shared instance could not be reopened),
+        the entry cached for the last known version is served instead of failing.
+        """
+        if con is None:
+            try:
+                with connection() as con:
+                    return self.query(sql, params, con)
+            except duckdb.IOException:
+                with self._lock:
+                    entry = self._entries.get((normalize_sql(sql), tuple(params or ()), self._version))
+                if entry is None:
+                    raise
+                self.hits += 1
+                return entry[0]
+        key = (normalize_sql(sql), tuple(params or ()), self.version(con))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (self.ttl is None or time.monotonic() - entry[2] < self.ttl):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                self._drop(key)
+            self.misses += 1
+
+        table = fetch_arrow(sql, params, con=con)
+        nbytes = table.nbytes
+        with self._lock:
+            if nbytes <= self.max_bytes:
+                if key in self._entries:
+                    self._drop(key)
+                self._entries[key] = (table, nbytes, time.monotonic())
+                self._bytes += nbytes
+                while self._bytes > self.max_bytes:
+                    self._drop(next(iter(self._entries)))
+                    self.evictions += 1
+        return table
+
+    def _drop(self, key):
+        _, nbytes, _ = self._entries.pop(key)
+        self._bytes -= nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_cache = QueryCache(
+    max_bytes=int(os.environ.get("SUPPLY_CHAIN_CACHE_BYTES", 256 * 1024 * 1024)),
+    ttl=float(os.environ["SUPPLY_CHAIN_CACHE_TTL"]) if os.environ.get("SUPPLY_CHAIN_CACHE_TTL") else None,
+)
+
+
+def cached_query(sql, params=None):
+    return _cache.query(sql, params)
+
+
+def cache_stats():
+    return _cache.stats()